@@ -1,18 +1,95 @@
-import requests
+import os
+from api import cassette, deadline
+from api.nomes import canonizar
+from api.singleflight import SingleFlight
+
+# Permite apontar para um servidor local (ex.: stub dos benchmarks)
+BASE_URL = os.environ.get('RPA_API_URL', 'https://restcountries.com/v3.1')
+
+# Devolvido por buscar_pais quando nenhum endpoint encontrou o país, mas alguma das respostas
+# veio do cassete e não da rede: o país é tratado como não encontrado, sem virar cache negativo
+NAO_CONFIRMADO = object()
+
+class ErroServidor(Exception):
+    # Falha transitória da API (5xx): a busca pode ser refeita mais tarde
+    pass
+
+def _requisitar(url):
+    # requests só é importado na primeira requisição real (reprodução de cassete não precisa dele)
+    import requests
+    try:
+        # O timeout nunca passa do que resta do prazo da execução
+        return requests.get(url, timeout=deadline.timeout())
+    except requests.Timeout:
+        if deadline.esgotado():
+            raise deadline.PrazoEsgotado(f"Prazo esgotado durante a requisição {url}")
+        raise
+
+def _get(url):
+    # Passa pelo cassete para permitir gravação/reprodução do tráfego
+    return cassette.interceptar(url, _requisitar)
+
+# Buscas simultâneas pelo mesmo nome compartilham uma única requisição
+_voos = SingleFlight()
 
 def buscar_pais(pais):
+    # A chave e a URL usam o nome canônico: ' Brasil' e 'brasil' são a mesma busca
+    nome = canonizar(pais)
+    return _voos.executar(nome, _buscar_pais, nome)
+
+def _transitorio(response):
+    # Erro do servidor ou limite de requisições: a resposta não diz se o país existe
+    return response.status_code >= 500 or response.status_code == 429
+
+def _buscar_pais(pais):
     # Tenta primeiro pelo endpoint de tradução
-    url_translation = f"https://restcountries.com/v3.1/translation/{pais}"
-    response = requests.get(url_translation)
+    deadline.verificar(f"'{pais}'")
+    url_translation = f"{BASE_URL}/translation/{pais}"
+    response = _get(url_translation)
     
     if response.status_code == 200:
         return response.json()
+    falha = response if _transitorio(response) else None
+    gravada = getattr(response, 'gravada', False)
     
     # Se falhar, tenta pelo endpoint de nome em inglês
-    url_name = f"https://restcountries.com/v3.1/name/{pais}"
-    response = requests.get(url_name)
+    deadline.verificar(f"'{pais}'")
+    url_name = f"{BASE_URL}/name/{pais}"
+    response = _get(url_name)
     
     if response.status_code == 200:
         return response.json()
     
+    # Só é "não encontrado" quando nenhum dos dois endpoints falhou; senão a busca pode ser refeita
+    falha = falha or (response if _transitorio(response) else None)
+    if falha is not None:
+        raise ErroServidor(f"API respondeu {falha.status_code} para '{pais}'")
+    
+    if getattr(response, 'gravada', False) or gravada:
+        return NAO_CONFIRMADO
     return None
+
+def buscar_por_codigos(codigos):
+    """Busca vários países em uma única requisição pelo endpoint /alpha?codes=.
+
+    Aceita códigos cca2 ou cca3 e devolve {codigo: json do país ou None}, na ordem recebida.
+    """
+    codigos = list(codigos)
+    if not codigos:
+        return {}
+    deadline.verificar(f"o lote {codigos[0]}..{codigos[-1]}")
+    response = _get(f"{BASE_URL}/alpha?codes={','.join(codigos)}")
+
+    if _transitorio(response):
+        raise ErroServidor(f"API respondeu {response.status_code} para o lote {codigos[0]}..{codigos[-1]}")
+    dados = response.json() if response.status_code == 200 else []
+    if isinstance(dados, dict):
+        dados = [dados]
+
+    # A resposta não segue a ordem pedida: distribui pelos códigos de cada país
+    por_codigo = {}
+    for pais in dados:
+        for chave in ('cca2', 'cca3'):
+            if pais.get(chave):
+                por_codigo[pais[chave].upper()] = pais
+    return {codigo: por_codigo.get(codigo.upper()) for codigo in codigos}
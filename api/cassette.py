@@ -0,0 +1,132 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Modos de operação: None (desligado), 'gravar', 'reproduzir' ou 'cache'
+_modo = None
+_caminho = None
+_latencia = 0.0
+_faixas = {}
+_lock = threading.Lock()
+
+
+class RespostaGravada:
+    # Imita a interface mínima de requests.Response usada por buscar_pais
+    # gravada: a resposta veio do cassete, não da rede (inclusive o 404 de uma requisição não gravada)
+    gravada = True
+
+    def __init__(self, status_code, dados):
+        self.status_code = status_code
+        self._dados = dados
+
+    def json(self):
+        return self._dados
+
+
+def _carregar(caminho):
+    import gzip
+    if not os.path.exists(caminho):
+        return {}
+    with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def gravar(caminho):
+    # Mantém o que já estava gravado para poder complementar um cassete
+    global _modo, _caminho, _faixas
+    _modo = 'gravar'
+    _caminho = caminho
+    _faixas = _carregar(caminho)
+    atexit.register(salvar)
+
+
+def reproduzir(caminho, latencia=0.0):
+    global _modo, _caminho, _faixas, _latencia
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Cassete não encontrado: {caminho}")
+    _modo = 'reproduzir'
+    _caminho = caminho
+    _latencia = latencia
+    _faixas = _carregar(caminho)
+
+
+def cache(caminho):
+    # Reproduz o que já foi gravado e busca (e grava) apenas o que falta
+    global _modo
+    gravar(caminho)
+    _modo = 'cache'
+
+
+def desligar():
+    global _modo
+    salvar()
+    _modo = None
+
+
+def salvar():
+    if _modo not in ('gravar', 'cache') or not _caminho:
+        return
+    import gzip
+    pasta = os.path.dirname(_caminho)
+    if pasta and not os.path.exists(pasta):
+        os.makedirs(pasta)
+    with _lock:
+        conteudo = json.dumps(_faixas, ensure_ascii=False, separators=(',', ':'))
+    # Grava em arquivo temporário e troca de uma vez para não corromper o cassete
+    temporario = _caminho + '.tmp'
+    with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, _caminho)
+
+
+def modo_do_ambiente():
+    # Modo que configurar_do_ambiente() vai usar, ou None sem RPA_CASSETTE
+    if not os.environ.get('RPA_CASSETTE'):
+        return None
+    return os.environ.get('RPA_CASSETTE_MODO', 'reproduzir')
+
+
+def configurar_do_ambiente():
+    # RPA_CASSETTE=arquivo.json.gz  RPA_CASSETTE_MODO=gravar|reproduzir|cache
+    # RPA_CASSETTE_LATENCIA=segundos (apenas na reprodução)
+    modo = modo_do_ambiente()
+    if modo is None:
+        return
+    caminho = os.environ['RPA_CASSETTE']
+    if modo == 'gravar':
+        gravar(caminho)
+    elif modo == 'reproduzir':
+        reproduzir(caminho, float(os.environ.get('RPA_CASSETTE_LATENCIA', '0')))
+    elif modo == 'cache':
+        cache(caminho)
+    else:
+        raise ValueError(f"Modo de cassete inválido: {modo}")
+
+
+def interceptar(url, requisitar):
+    # Chamado por api.buscar_pais no lugar de requests.get
+    if _modo == 'reproduzir':
+        if _latencia:
+            time.sleep(_latencia)
+        faixa = _faixas.get(url)
+        if faixa is None:
+            # Requisição que não foi gravada se comporta como "não encontrado"
+            return RespostaGravada(404, None)
+        return RespostaGravada(faixa[0], faixa[1])
+
+    if _modo == 'cache':
+        faixa = _faixas.get(url)
+        if faixa is not None:
+            return RespostaGravada(faixa[0], faixa[1])
+
+    response = requisitar(url)
+
+    # No modo cache, erros transitórios do servidor não são guardados
+    if _modo == 'gravar' or (_modo == 'cache' and response.status_code < 500):
+        dados = response.json() if response.status_code == 200 else None
+        with _lock:
+            _faixas[url] = [response.status_code, dados]
+
+    return response
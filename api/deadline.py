@@ -0,0 +1,52 @@
+import os
+import time
+
+# Tempo máximo de cada requisição à API (conexão e cada leitura), em segundos
+TIMEOUT_PADRAO = 10.0
+
+timeout_requisicao = TIMEOUT_PADRAO
+# Instante (time.monotonic) em que acaba o orçamento de tempo da execução; None = sem prazo
+_limite = None
+
+
+class PrazoEsgotado(Exception):
+    # O orçamento de tempo da execução acabou: o nome não foi buscado e fica para a próxima execução
+    pass
+
+
+def configurar(timeout=None, prazo=None):
+    """Define o timeout por requisição e o prazo total da execução (segundos a partir de agora)"""
+    global timeout_requisicao, _limite
+    timeout_requisicao = TIMEOUT_PADRAO if timeout is None else timeout
+    _limite = None if prazo is None else time.monotonic() + prazo
+
+
+def configurar_do_ambiente():
+    # RPA_API_TIMEOUT=segundos por requisição  RPA_PRAZO=segundos para a execução inteira
+    timeout = os.environ.get('RPA_API_TIMEOUT')
+    prazo = os.environ.get('RPA_PRAZO')
+    configurar(float(timeout) if timeout else None, float(prazo) if prazo else None)
+
+
+def restante():
+    if _limite is None:
+        return None
+    return max(0.0, _limite - time.monotonic())
+
+
+def esgotado():
+    return _limite is not None and time.monotonic() >= _limite
+
+
+def verificar(descricao):
+    # Chamado antes de cada requisição, inclusive na tentativa pelo endpoint alternativo
+    if esgotado():
+        raise PrazoEsgotado(f"Prazo esgotado antes de buscar {descricao}")
+
+
+def timeout():
+    """Timeout da próxima requisição: o padrão, limitado ao que resta do prazo"""
+    sobra = restante()
+    if sobra is None:
+        return timeout_requisicao
+    return max(0.001, min(timeout_requisicao, sobra))
@@ -0,0 +1,6 @@
+import unicodedata
+
+
+def canonizar(pais):
+    # Mesma grafia para variações de caixa, espaços e composição Unicode (mantém os acentos)
+    return ' '.join(unicodedata.normalize('NFC', pais).split()).lower()
@@ -0,0 +1,290 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import pathlib
+import sqlite3
+import sys
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Respostas menores que isso não compensam o custo da compressão
+TAMANHO_MINIMO_GZIP = 512
+MAX_RESPOSTAS_EM_CACHE = 10000
+# O serviço só responde GET/HEAD; corpos maiores que isso são recusados sem serem lidos
+TAMANHO_MAXIMO_CORPO = 64 * 1024
+
+MOTIVOS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class Resposta:
+    __slots__ = ('status', 'corpo', 'corpo_gzip', 'etag')
+
+    def __init__(self, status, dados):
+        self.status = status
+        self.corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        self.etag = '"' + hashlib.blake2b(self.corpo, digest_size=12).hexdigest() + '"'
+        # A versão comprimida é calculada uma vez e reaproveitada enquanto estiver no cache
+        self.corpo_gzip = gzip.compress(self.corpo, 6) if len(self.corpo) >= TAMANHO_MINIMO_GZIP else None
+
+
+class CacheQuente:
+    """Respostas prontas por URL, descartadas quando o banco muda (PRAGMA data_version)"""
+
+    def __init__(self, db, intervalo=0.1):
+        self.db = db
+        self.intervalo = intervalo
+        self.respostas = {}
+        self.versao = None
+        self.verificado_em = 0.0
+        self.acertos = 0
+        self.faltas = 0
+
+    def validar(self):
+        # A versão só é consultada a cada `intervalo` segundos para não custar uma query por requisição
+        agora = time.monotonic()
+        if agora - self.verificado_em < self.intervalo:
+            return
+        self.verificado_em = agora
+        versao = self.db.execute('PRAGMA data_version').fetchone()[0]
+        if versao != self.versao:
+            self.versao = versao
+            self.respostas.clear()
+
+    def obter(self, chave, gerar):
+        self.validar()
+        resposta = self.respostas.get(chave)
+        if resposta is not None:
+            self.acertos += 1
+            return resposta
+        self.faltas += 1
+        resposta = gerar()
+        if len(self.respostas) >= MAX_RESPOSTAS_EM_CACHE:
+            self.respostas.clear()
+        self.respostas[chave] = resposta
+        return resposta
+
+
+class ServidorPaises:
+    """Serviço HTTP de consulta sobre paises.db.
+
+    `indice_geo` monta o índice das rotas geográficas a partir da conexão (ex.:
+    core.geo.IndiceGeografico.do_banco); é recebido de fora para a camada api não depender de core.
+    Sem ele, essas rotas respondem 404.
+    """
+
+    def __init__(self, caminho_db, intervalo_validacao=0.1, indice_geo=None):
+        caminho = pathlib.Path(caminho_db).resolve()
+        if not caminho.exists():
+            raise FileNotFoundError(f"Banco de dados não encontrado: {caminho_db}")
+        # Somente leitura: o serviço nunca altera o banco
+        self.db = sqlite3.connect(caminho.as_uri() + '?mode=ro', uri=True)
+        self.db.row_factory = sqlite3.Row
+        # lower() do SQLite só converte ASCII ('Åland' continuaria 'Å'); as buscas por nome usam
+        # o mesmo casefold do Python nos dois lados da comparação
+        self.db.create_function('casefold', 1, lambda texto: texto.casefold() if texto else texto,
+                                deterministic=True)
+        self.cache = CacheQuente(self.db, intervalo_validacao)
+        self._montar_geo = indice_geo
+        self._geo = None
+        self._geo_versao = None
+
+    def _linhas(self, sql, parametros=()):
+        return [dict(linha) for linha in self.db.execute(sql, parametros)]
+
+    def _pais(self, nome):
+        nome = nome.strip().casefold()
+        linhas = self._linhas(
+            'SELECT * FROM paises WHERE casefold(nome_comum) = ? OR casefold(nome_oficial) = ? LIMIT 1', (nome, nome))
+        if not linhas:
+            return Resposta(404, {'erro': f"País não encontrado: {nome}"})
+        return Resposta(200, linhas[0])
+
+    def _regioes(self):
+        linhas = self._linhas('SELECT regiao, COUNT(*) AS total FROM paises GROUP BY regiao ORDER BY regiao')
+        return Resposta(200, linhas)
+
+    def _regiao(self, regiao):
+        linhas = self._linhas('SELECT * FROM paises WHERE casefold(regiao) = ? ORDER BY nome_comum', (regiao.casefold(),))
+        if not linhas:
+            return Resposta(404, {'erro': f"Região não encontrada: {regiao}"})
+        return Resposta(200, linhas)
+
+    def _busca(self, termo, limite):
+        if not termo:
+            return Resposta(400, {'erro': "Parâmetro 'q' obrigatório"})
+        termo = termo.casefold()
+        padrao = '%' + termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        linhas = self._linhas('''
+            SELECT * FROM paises
+            WHERE casefold(nome_comum) LIKE ? ESCAPE '\\' OR casefold(nome_oficial) LIKE ? ESCAPE '\\'
+            ORDER BY nome_comum LIMIT ?''', (padrao, padrao, limite))
+        return Resposta(200, linhas)
+
+    def _indice_geo(self):
+        # Remontado junto com o cache quente, quando o banco muda
+        if self._geo is None or self._geo_versao != self.cache.versao:
+            self._geo = self._montar_geo(self.db)
+            self._geo_versao = self.cache.versao
+        return self._geo
+
+    def _proximos(self, nome, n):
+        resultado = self._indice_geo().mais_proximos(nome, n)
+        if resultado is None:
+            return Resposta(404, {'erro': f"País sem coordenadas ou não encontrado: {nome}"})
+        return Resposta(200, resultado)
+
+    def _vizinhos(self, nome, k):
+        resultado = self._indice_geo().vizinhos(nome, k)
+        if resultado is None:
+            return Resposta(404, {'erro': f"País não encontrado: {nome}"})
+        return Resposta(200, resultado)
+
+    def rotear(self, alvo):
+        partes = urlsplit(alvo)
+        caminho = [unquote(parte) for parte in partes.path.split('/') if parte]
+
+        if not caminho or caminho == ['saude']:
+            return Resposta(200, {'status': 'ok'})
+        parametros = parse_qs(partes.query)
+        geografica = (caminho == ['raio'] or
+                      (caminho[0] == 'paises' and len(caminho) == 3 and caminho[2] in ('proximos', 'vizinhos')))
+        if geografica and self._montar_geo is None:
+            return Resposta(404, {'erro': 'Consultas geográficas não configuradas'})
+        if caminho[0] == 'paises' and len(caminho) == 2:
+            return self._pais(caminho[1])
+        if caminho[0] == 'paises' and len(caminho) == 3 and caminho[2] in ('proximos', 'vizinhos'):
+            try:
+                if caminho[2] == 'proximos':
+                    return self._proximos(caminho[1], max(1, min(int(parametros.get('n', ['5'])[0]), 500)))
+                return self._vizinhos(caminho[1], max(1, min(int(parametros.get('k', ['1'])[0]), 20)))
+            except ValueError:
+                return Resposta(400, {'erro': "Parâmetro 'n' ou 'k' inválido"})
+        if caminho == ['raio']:
+            try:
+                latitude = float(parametros['lat'][0])
+                longitude = float(parametros['lon'][0])
+                raio = float(parametros.get('km', ['500'])[0])
+            except (KeyError, ValueError):
+                return Resposta(400, {'erro': "Parâmetros 'lat' e 'lon' obrigatórios; 'km' opcional"})
+            if not all(math.isfinite(valor) for valor in (latitude, longitude, raio)) or raio < 0:
+                return Resposta(400, {'erro': "Parâmetros 'lat', 'lon' e 'km' devem ser finitos; 'km' não negativo"})
+            return Resposta(200, self._indice_geo().no_raio(latitude, longitude, raio))
+        if caminho == ['regioes']:
+            return self._regioes()
+        if caminho[0] == 'regioes' and len(caminho) == 2:
+            return self._regiao(caminho[1])
+        if caminho == ['busca']:
+            termo = parametros.get('q', [''])[0].strip()
+            try:
+                limite = max(1, min(int(parametros.get('limite', ['50'])[0]), 500))
+            except ValueError:
+                return Resposta(400, {'erro': "Parâmetro 'limite' inválido"})
+            return self._busca(termo, limite)
+        return Resposta(404, {'erro': 'Rota não encontrada'})
+
+    def responder(self, metodo, alvo, cabecalhos, manter_conexao):
+        if metodo not in ('GET', 'HEAD'):
+            resposta = Resposta(405, {'erro': 'Método não permitido'})
+        else:
+            try:
+                resposta = self.cache.obter(alvo, lambda: self.rotear(alvo))
+            except Exception as erro:
+                # A falha não fica no cache e a conexão continua respondendo
+                print(f"✗ Erro ao responder {alvo}: {erro}", file=sys.stderr)
+                resposta = Resposta(500, {'erro': 'Erro interno'})
+
+        status = resposta.status
+        corpo = resposta.corpo
+        extras = [f"ETag: {resposta.etag}"]
+
+        if status == 200 and resposta.etag in cabecalhos.get('if-none-match', ''):
+            status = 304
+            corpo = b''
+        elif resposta.corpo_gzip is not None and 'gzip' in cabecalhos.get('accept-encoding', ''):
+            corpo = resposta.corpo_gzip
+            extras.append('Content-Encoding: gzip')
+        if resposta.corpo_gzip is not None:
+            extras.append('Vary: Accept-Encoding')
+
+        cabecalho = (
+            f"HTTP/1.1 {status} {MOTIVOS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if manter_conexao else 'close'}\r\n"
+            + ''.join(extra + '\r\n' for extra in extras) + "\r\n"
+        ).encode('latin-1')
+        if metodo == 'HEAD':
+            return cabecalho
+        return cabecalho + corpo
+
+    async def atender(self, reader, writer):
+        try:
+            while True:
+                try:
+                    bruto = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                linhas = bruto.decode('latin-1').split('\r\n')
+                try:
+                    metodo, alvo, versao = linhas[0].split(' ', 2)
+                except ValueError:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+
+                cabecalhos = {}
+                for linha in linhas[1:]:
+                    if ':' in linha:
+                        chave, valor = linha.split(':', 1)
+                        cabecalhos[chave.strip().lower()] = valor.strip()
+
+                # Descarta um eventual corpo para manter a conexão sincronizada
+                try:
+                    tamanho = int(cabecalhos.get('content-length', '0') or 0)
+                    if tamanho < 0:
+                        raise ValueError(tamanho)
+                except ValueError:
+                    # Sem um tamanho válido não há como saber onde começa a próxima requisição
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                if tamanho > TAMANHO_MAXIMO_CORPO:
+                    writer.write(b"HTTP/1.1 413 Content Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                if tamanho:
+                    try:
+                        await reader.readexactly(tamanho)
+                    except asyncio.IncompleteReadError:
+                        # O cliente desconectou no meio do corpo
+                        break
+
+                conexao = cabecalhos.get('connection', '').lower()
+                manter = conexao != 'close' if versao == 'HTTP/1.1' else conexao == 'keep-alive'
+
+                writer.write(self.responder(metodo, alvo, cabecalhos, manter))
+                await writer.drain()
+                if not manter:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def servir(self, host='127.0.0.1', porta=8080):
+        servidor = await asyncio.start_server(self.atender, host, porta, backlog=1024)
+        enderecos = ', '.join(str(sock.getsockname()) for sock in servidor.sockets)
+        print(f"✓ Serviço de consulta em {enderecos}")
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def executar(caminho_db, host='127.0.0.1', porta=8080, indice_geo=None):
+    servidor = ServidorPaises(caminho_db, indice_geo=indice_geo)
+    try:
+        asyncio.run(servidor.servir(host, porta))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.db.close()
@@ -0,0 +1,45 @@
+import threading
+
+
+class _Chamada:
+    __slots__ = ('evento', 'resultado', 'erro')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class SingleFlight:
+    """Garante uma única execução em andamento por chave; chamadas simultâneas compartilham o resultado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo = {}
+        self.compartilhadas = 0
+
+    def executar(self, chave, funcao, *args):
+        with self._lock:
+            chamada = self._em_voo.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_voo[chave] = _Chamada()
+            else:
+                self.compartilhadas += 1
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao(*args)
+        except BaseException as erro:
+            chamada.erro = erro
+            raise
+        finally:
+            with self._lock:
+                del self._em_voo[chave]
+            chamada.evento.set()
+        return chamada.resultado
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Mede o tempo de inicialização do main.py em processos novos.
+
+Uso:
+    python benchmarks/bench_startup.py --repeticoes 30 --saida startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cenários de inicialização: (nome, argumentos do interpretador)
+CENARIOS = [
+    ('python (referência)', ['-c', 'pass']),
+    ('import main', ['-c', 'import main']),
+    ('main.py --help', [os.path.join(RAIZ, 'main.py'), '--help']),
+    ('main.py migrate (banco atualizado)', [os.path.join(RAIZ, 'main.py'), 'migrate', '--db', 'bench.db']),
+]
+
+
+def _medir(argumentos, repeticoes, diretorio):
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable] + argumentos, cwd=diretorio, env=ambiente,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return {
+        'repeticoes': repeticoes,
+        'min_ms': round(tempos[0] * 1000, 2),
+        'p50_ms': round(tempos[len(tempos) // 2] * 1000, 2),
+        'max_ms': round(tempos[-1] * 1000, 2),
+    }
+
+
+def _modulos_importados(diretorio):
+    # Verifica que importar o main não carrega dependências pesadas nem cria arquivos
+    codigo = "import sys, main; print(','.join(m for m in ('requests', 'sqlite3', 'multiprocessing') if m in sys.modules))"
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    saida = subprocess.run([sys.executable, '-c', codigo], cwd=diretorio, env=ambiente,
+                           capture_output=True, text=True, check=True)
+    return [m for m in saida.stdout.strip().split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização do main.py')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--saida', help='arquivo JSON de resultados')
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='rpa_startup_')
+
+    importados = _modulos_importados(diretorio)
+    efeitos = os.listdir(diretorio)
+
+    resultados = []
+    for nome, argumentos in CENARIOS:
+        resultado = _medir(argumentos, args.repeticoes, diretorio)
+        resultado['cenario'] = nome
+        resultados.append(resultado)
+        print(f"{nome:40} min {resultado['min_ms']:>8} ms  p50 {resultado['p50_ms']:>8} ms")
+
+    print(f"Módulos pesados carregados por 'import main': {', '.join(importados) or 'nenhum'}")
+    print(f"Arquivos criados por 'import main': {', '.join(efeitos) or 'nenhum'}")
+
+    if args.saida:
+        relatorio = {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'modulos_pesados_no_import': importados,
+            'arquivos_criados_no_import': efeitos,
+            'resultados': resultados,
+        }
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados salvos em {args.saida}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do serviço de consulta (python main.py serve).
+
+Abre conexões keep-alive simultâneas e dispara GETs por um tempo fixo.
+
+Uso:
+    python benchmarks/load_server.py --url http://127.0.0.1:8080 --conexoes 50 --duracao 10
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+
+async def _cliente(host, porta, caminhos, fim, latencias, erros, gzip_ativo, etags):
+    reader, writer = await asyncio.open_connection(host, porta)
+    aleatorio = random.Random()
+    try:
+        while time.perf_counter() < fim:
+            caminho = aleatorio.choice(caminhos)
+            cabecalhos = f"GET {caminho} HTTP/1.1\r\nHost: {host}\r\n"
+            if gzip_ativo:
+                cabecalhos += "Accept-Encoding: gzip\r\n"
+            if caminho in etags and aleatorio.random() < 0.5:
+                # Metade das repetições revalida com If-None-Match, como um cliente com cache
+                cabecalhos += f"If-None-Match: {etags[caminho]}\r\n"
+            inicio = time.perf_counter()
+            writer.write((cabecalhos + "\r\n").encode('latin-1'))
+            bruto = await reader.readuntil(b'\r\n\r\n')
+            linhas = bruto.decode('latin-1').split('\r\n')
+            status = int(linhas[0].split(' ')[1])
+            tamanho = 0
+            for linha in linhas[1:]:
+                chave, _, valor = linha.partition(':')
+                if chave.lower() == 'content-length':
+                    tamanho = int(valor)
+                elif chave.lower() == 'etag':
+                    etags[caminho] = valor.strip()
+            if tamanho:
+                await reader.readexactly(tamanho)
+            latencias.append(time.perf_counter() - inicio)
+            if status >= 500:
+                erros.append(status)
+    finally:
+        writer.close()
+
+
+async def _executar(url, conexoes, duracao, caminhos, gzip_ativo):
+    partes = urlsplit(url)
+    latencias = []
+    erros = []
+    etags = {}
+    fim = time.perf_counter() + duracao
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        _cliente(partes.hostname, partes.port or 80, caminhos, fim, latencias, erros, gzip_ativo, etags)
+        for _ in range(conexoes)))
+    return latencias, erros, time.perf_counter() - inicio
+
+
+def _caminhos_padrao(nomes, regioes):
+    caminhos = [f"/paises/{quote(nome)}" for nome in nomes]
+    caminhos += [f"/regioes/{quote(regiao)}" for regiao in regioes]
+    caminhos += ['/regioes', '/busca?q=rep', '/busca?q=an', '/paises/inexistente']
+    return caminhos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do serviço de consulta')
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--conexoes', type=int, default=50)
+    parser.add_argument('--duracao', type=float, default=10.0)
+    parser.add_argument('--sem-gzip', action='store_true')
+    parser.add_argument('--nomes', default='Brazil,France,Japan,Germany,China,Mexico',
+                        help='países consultados, separados por vírgula')
+    parser.add_argument('--regioes', default='Europe,Asia,Americas,Africa,Oceania')
+    parser.add_argument('--saida', help='arquivo JSON de resultados')
+    args = parser.parse_args()
+
+    caminhos = _caminhos_padrao(args.nomes.split(','), args.regioes.split(','))
+    latencias, erros, duracao = asyncio.run(
+        _executar(args.url, args.conexoes, args.duracao, caminhos, not args.sem_gzip))
+
+    latencias.sort()
+    total = len(latencias)
+    resultado = {
+        'requisicoes': total,
+        'erros': len(erros),
+        'duracao_s': round(duracao, 3),
+        'req_por_s': round(total / duracao, 1) if duracao else 0.0,
+        'p50_ms': round(latencias[total // 2] * 1000, 3) if total else 0.0,
+        'p99_ms': round(latencias[min(total - 1, int(total * 0.99))] * 1000, 3) if total else 0.0,
+        'conexoes': args.conexoes,
+    }
+    print(json.dumps(resultado, indent=2))
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+    return 0 if not erros else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmarks ponta a ponta do pipeline RPA contra um stub local da API REST Countries.
+
+Uso:
+    python benchmarks/run_benchmarks.py --quantidade 2000 --latencia 0.005 --saida resultado.json
+    python benchmarks/run_benchmarks.py --comparar base.json --saida atual.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import gerar_paises, iniciar_servidor
+from workload import gerar_carga
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    posicao = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return ordenados[posicao]
+
+
+def _resumir(nome, latencias, duracao_total):
+    ordenados = sorted(latencias)
+    total = len(ordenados)
+    return {
+        'etapa': nome,
+        'operacoes': total,
+        'duracao_s': round(duracao_total, 6),
+        'vazao_ops_s': round(total / duracao_total, 2) if duracao_total else 0.0,
+        'media_ms': round(sum(ordenados) / total * 1000, 4) if total else 0.0,
+        'p50_ms': round(_percentil(ordenados, 50) * 1000, 4),
+        'p90_ms': round(_percentil(ordenados, 90) * 1000, 4),
+        'p99_ms': round(_percentil(ordenados, 99) * 1000, 4),
+        'max_ms': round(ordenados[-1] * 1000, 4) if total else 0.0,
+    }
+
+
+def _medir(nome, funcao, argumentos):
+    latencias = []
+    erros = 0
+    inicio_total = time.perf_counter()
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        try:
+            funcao(*argumento)
+        except Exception:
+            # Erros simulados pelo stub (5xx) contam na latência, mas são reportados à parte
+            erros += 1
+        latencias.append(time.perf_counter() - inicio)
+    resumo = _resumir(nome, latencias, time.perf_counter() - inicio_total)
+    resumo['erros'] = erros
+    return resumo
+
+
+def executar(quantidade, latencia, taxa_erro, zipf_s, num_paises):
+    paises = gerar_paises(num_paises)
+    carga = gerar_carga(paises, quantidade, zipf_s=zipf_s)
+    servidor, url = iniciar_servidor(latencia, taxa_erro, paises)
+
+    # O banco é criado relativo ao diretório atual, então o benchmark roda isolado
+    diretorio = tempfile.mkdtemp(prefix='rpa_bench_')
+    diretorio_original = os.getcwd()
+    os.chdir(diretorio)
+
+    resultados = []
+    try:
+        from api import api
+        from core import filter, insert
+        import main as main_module
+
+        api.BASE_URL = url
+
+        resultados.append(_medir('api.buscar_pais', api.buscar_pais, [(nome,) for nome in carga]))
+
+        # filtrar_dados imprime o status de nomes desconhecidos; não queremos medir o terminal
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            resultados.append(_medir('core.filter.filtrar_dados', filter.filtrar_dados, [(nome,) for nome in carga]))
+
+            # Inserções: primeiro países novos, depois as duplicatas da carga
+            novos = []
+            for pais in paises:
+                try:
+                    pais_data = filter.filtrar_dados(pais['name']['common'])
+                except Exception:
+                    continue
+                if pais_data:
+                    novos.append((pais_data, pais['name']['common']))
+            resultados.append(_medir('core.insert.insert_pais (novos)', insert.insert_pais, novos))
+            resultados.append(_medir('core.insert.insert_pais (duplicados)', insert.insert_pais, novos))
+
+            # main.main fecha a conexão ao final, por isso roda por último
+            inicio = time.perf_counter()
+            main_module.main(carga)
+            duracao = time.perf_counter() - inicio
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        # Para o pipeline completo só a duração total é observável de fora
+        resultados.append({
+            'etapa': 'main.main',
+            'operacoes': len(carga),
+            'duracao_s': round(duracao, 6),
+            'vazao_ops_s': round(len(carga) / duracao, 2) if duracao else 0.0,
+        })
+    finally:
+        os.chdir(diretorio_original)
+        servidor.shutdown()
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {
+            'quantidade': quantidade,
+            'latencia_s': latencia,
+            'taxa_erro': taxa_erro,
+            'zipf_s': zipf_s,
+            'num_paises': num_paises,
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(base, atual):
+    # Mostra a variação de vazão e p99 por etapa em relação a uma execução anterior
+    anteriores = {r['etapa']: r for r in base['resultados']}
+    print(f"{'Etapa':40} {'vazão (ops/s)':>24} {'p99 (ms)':>24}")
+    for resultado in atual['resultados']:
+        anterior = anteriores.get(resultado['etapa'])
+        if not anterior:
+            continue
+        variacao_vazao = _variacao(anterior['vazao_ops_s'], resultado['vazao_ops_s'])
+        linha = f"{resultado['etapa']:40} {resultado['vazao_ops_s']:>14} ({variacao_vazao:+.1f}%)"
+        if 'p99_ms' in resultado and 'p99_ms' in anterior:
+            variacao_p99 = _variacao(anterior['p99_ms'], resultado['p99_ms'])
+            linha += f" {resultado['p99_ms']:>14} ({variacao_p99:+.1f}%)"
+        print(linha)
+
+
+def _variacao(antes, depois):
+    return (depois - antes) / antes * 100 if antes else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do pipeline RPA')
+    parser.add_argument('--quantidade', type=int, default=1000, help='nomes na carga sintética')
+    parser.add_argument('--latencia', type=float, default=0.0, help='latência simulada do stub (s)')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='fração de respostas 500 do stub')
+    parser.add_argument('--zipf', type=float, default=1.1, help='expoente da distribuição de Zipf')
+    parser.add_argument('--paises', type=int, default=250, help='países disponíveis no stub')
+    parser.add_argument('--saida', help='arquivo JSON de resultados')
+    parser.add_argument('--comparar', help='arquivo JSON de uma execução anterior')
+    args = parser.parse_args()
+
+    relatorio = executar(args.quantidade, args.latencia, args.taxa_erro, args.zipf, args.paises)
+
+    for resultado in relatorio['resultados']:
+        linha = f"{resultado['etapa']:40} {resultado['vazao_ops_s']:>12} ops/s"
+        if 'p50_ms' in resultado:
+            linha += f"  p50 {resultado['p50_ms']:>9} ms  p99 {resultado['p99_ms']:>9} ms"
+        print(linha)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"Resultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar(json.load(arquivo), relatorio)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+# (nome em português, nome comum em inglês, nome oficial, capital, região)
+PAISES_BASE = [
+    ('Brasil', 'Brazil', 'Federative Republic of Brazil', 'Brasília', 'Americas'),
+    ('França', 'France', 'French Republic', 'Paris', 'Europe'),
+    ('Japão', 'Japan', 'Japan', 'Tokyo', 'Asia'),
+    ('México', 'Mexico', 'United Mexican States', 'Mexico City', 'Americas'),
+    ('Alemanha', 'Germany', 'Federal Republic of Germany', 'Berlin', 'Europe'),
+    ('Suíça', 'Switzerland', 'Swiss Confederation', 'Bern', 'Europe'),
+    ('China', 'China', "People's Republic of China", 'Beijing', 'Asia'),
+    ('Taiwan', 'Taiwan', 'Republic of China (Taiwan)', 'Taipei', 'Asia'),
+    ('Estados Unidos', 'United States', 'United States of America', 'Washington D.C.', 'Americas'),
+    ('Reino Unido', 'United Kingdom', 'United Kingdom of Great Britain and Northern Ireland', 'London', 'Europe'),
+    ('África do Sul', 'South Africa', 'Republic of South Africa', 'Pretoria', 'Africa'),
+    ('Espanha', 'Spain', 'Kingdom of Spain', 'Madrid', 'Europe'),
+    ('Itália', 'Italy', 'Italian Republic', 'Rome', 'Europe'),
+    ('Canadá', 'Canada', 'Canada', 'Ottawa', 'Americas'),
+    ('Índia', 'India', 'Republic of India', 'New Delhi', 'Asia'),
+    ('Rússia', 'Russia', 'Russian Federation', 'Moscow', 'Europe'),
+    ('Portugal', 'Portugal', 'Portuguese Republic', 'Lisbon', 'Europe'),
+    ('Argentina', 'Argentina', 'Argentine Republic', 'Buenos Aires', 'Americas'),
+    ('Egito', 'Egypt', 'Arab Republic of Egypt', 'Cairo', 'Africa'),
+    ('Austrália', 'Australia', 'Commonwealth of Australia', 'Canberra', 'Oceania'),
+]
+
+
+def _codigo(indice, tamanho):
+    # Códigos alfabéticos únicos por índice (AA, AB, ... / AAA, AAB, ...)
+    letras = []
+    for _ in range(tamanho):
+        indice, resto = divmod(indice, 26)
+        letras.append(chr(ord('A') + resto))
+    return ''.join(reversed(letras))
+
+
+def _gerar_pais(indice, nome_pt, nome_en, nome_oficial, capital, regiao):
+    # Estrutura semelhante à resposta real da API REST Countries v3.1
+    codigo = _codigo(indice, 2)
+    return {
+        'name': {'common': nome_en, 'official': nome_oficial},
+        'cca2': codigo,
+        'cca3': _codigo(indice, 3),
+        'capital': [capital],
+        'continents': [regiao],
+        'region': regiao,
+        'subregion': f"{regiao} {indice % 4}",
+        'population': 1000000 + indice * 7919,
+        'area': 10000.0 + indice * 13.5,
+        'currencies': {'XXX': {'name': f"Moeda {nome_en}", 'symbol': '$'}},
+        'languages': {'xxx': f"Idioma {nome_en}"},
+        'timezones': [f"UTC+0{indice % 10}:00"],
+        'latlng': [float((indice * 37) % 180 - 90), float((indice * 61) % 360 - 180)],
+        'borders': [],
+        'flags': {'png': f"https://flagcdn.com/w320/{codigo.lower()}.png"},
+        'translations': {'por': {'common': nome_pt, 'official': nome_oficial}},
+    }
+
+
+def gerar_paises(quantidade=250):
+    # Completa a lista base com países sintéticos até a quantidade pedida
+    paises = []
+    for indice in range(quantidade):
+        if indice < len(PAISES_BASE):
+            base = PAISES_BASE[indice]
+        else:
+            nome = f"Pais Sintetico {indice}"
+            base = (f"País Sintético {indice}", nome, f"Republic of {nome}", f"Capital {indice}", 'Europe')
+        paises.append(_gerar_pais(indice, *base))
+    return paises
+
+
+class _Indice:
+    # Pré-calcula os nomes em minúsculas para responder buscas parciais como a API real
+    def __init__(self, paises):
+        self.paises = paises
+        self.por_traducao = []
+        self.por_nome = []
+        for pais in paises:
+            traducoes = ' '.join(t['common'].lower() for t in pais['translations'].values())
+            self.por_traducao.append((traducoes, pais))
+            nomes = f"{pais['name']['common']} {pais['name']['official']}".lower()
+            self.por_nome.append((nomes, pais))
+
+    def buscar_codigos(self, codigos):
+        return [pais for pais in self.paises if pais['cca2'] in codigos or pais['cca3'] in codigos]
+
+    def buscar(self, tabela, termo):
+        termo = termo.lower().strip()
+        return [pais for nomes, pais in tabela if termo in nomes]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        config = self.server.config
+        if config['latencia']:
+            time.sleep(config['latencia'])
+
+        if config['taxa_erro'] and random.random() < config['taxa_erro']:
+            self._responder(500, {'status': 500, 'message': 'Internal Server Error'})
+            return
+
+        caminho, _, consulta = self.path.partition('?')
+        if caminho.endswith('/alpha') and consulta.startswith('codes='):
+            codigos = {codigo.upper() for codigo in unquote(consulta[len('codes='):]).split(',') if codigo}
+            self._responder(200, self.server.indice.buscar_codigos(codigos))
+            return
+
+        partes = unquote(self.path).split('/')
+        # Formato esperado: /v3.1/<endpoint>/<termo>
+        if len(partes) != 4:
+            self._responder(404, {'status': 404, 'message': 'Not Found'})
+            return
+        endpoint, termo = partes[2], partes[3]
+
+        indice = self.server.indice
+        if endpoint == 'translation':
+            resultado = indice.buscar(indice.por_traducao, termo)
+        elif endpoint == 'name':
+            resultado = indice.buscar(indice.por_nome, termo)
+        else:
+            resultado = []
+
+        if resultado:
+            self._responder(200, resultado)
+        else:
+            self._responder(404, {'status': 404, 'message': 'Not Found'})
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, format, *args):
+        # Silencia o log de cada requisição para não distorcer as medições
+        pass
+
+
+def iniciar_servidor(latencia=0.0, taxa_erro=0.0, paises=None, porta=0):
+    # Sobe o stub em uma thread e retorna (servidor, url_base)
+    servidor = ThreadingHTTPServer(('127.0.0.1', porta), _Handler)
+    servidor.daemon_threads = True
+    servidor.config = {'latencia': latencia, 'taxa_erro': taxa_erro}
+    servidor.indice = _Indice(paises if paises is not None else gerar_paises())
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    host, porta = servidor.server_address
+    return servidor, f"http://{host}:{porta}/v3.1"
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Stub local da API REST Countries')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=0.0)
+    parser.add_argument('--taxa-erro', type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(args.latencia, args.taxa_erro, porta=args.porta)
+    print(f"Stub REST Countries em {url} (Ctrl-C para encerrar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
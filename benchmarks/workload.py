@@ -0,0 +1,38 @@
+import random
+import unicodedata
+
+
+def sem_acento(texto):
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+def _variar(nome, aleatorio):
+    # Variações de grafia que um usuário real digitaria para o mesmo país
+    opcao = aleatorio.randrange(4)
+    if opcao == 0:
+        return nome
+    if opcao == 1:
+        return nome.upper()
+    if opcao == 2:
+        return f"  {nome.lower()} "
+    return sem_acento(nome).lower()
+
+
+def gerar_carga(paises, quantidade, zipf_s=1.1, taxa_desconhecidos=0.05, taxa_variantes=0.3, semente=42):
+    """Gera uma lista de nomes de busca com repetição segundo uma distribuição de Zipf"""
+    aleatorio = random.Random(semente)
+    nomes = [p['translations']['por']['common'] for p in paises]
+
+    # Peso do k-ésimo país mais popular: 1 / k^s
+    pesos = [1.0 / (posicao ** zipf_s) for posicao in range(1, len(nomes) + 1)]
+
+    carga = []
+    for indice in range(quantidade):
+        if aleatorio.random() < taxa_desconhecidos:
+            carga.append(f"desconhecido {indice}")
+            continue
+        nome = aleatorio.choices(nomes, weights=pesos)[0]
+        if aleatorio.random() < taxa_variantes:
+            nome = _variar(nome, aleatorio)
+        carga.append(nome)
+    return carga
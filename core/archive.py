@@ -0,0 +1,114 @@
+import json
+import zlib
+from datetime import datetime
+
+import models
+from core import filter, metrics
+
+def _extrair_gini(pais_info):
+    # A API devolve {"ano": valor}; usa o ano mais recente
+    gini = pais_info.get('gini') or {}
+    return gini[max(gini)] if gini else None
+
+# Colunas que podem ser derivadas do JSON arquivado: nome -> (tipo SQL, extrator).
+# Extrator None: a coluna vem de filter.extrair_campos, o mesmo usado na ingestão
+CAMPOS_EXTRAS = {
+    'latitude': ('REAL', None),
+    'longitude': ('REAL', None),
+    'fronteiras': ('TEXT', None),
+    'gini': ('REAL', _extrair_gini),
+    'cca2': ('TEXT', None),
+    'cca3': ('TEXT', None),
+    'independente': ('INTEGER', lambda p: None if p.get('independent') is None else int(p['independent'])),
+    'sem_litoral': ('INTEGER', lambda p: None if p.get('landlocked') is None else int(p['landlocked'])),
+    'bandeira_svg': ('TEXT', lambda p: p.get('flags', {}).get('svg', '')),
+    'mapa_url': ('TEXT', lambda p: p.get('maps', {}).get('googleMaps', '')),
+}
+
+def compactar(pais_info):
+    return zlib.compress(json.dumps(pais_info, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+
+def descompactar(payload):
+    return json.loads(zlib.decompress(payload))
+
+def arquivar(nome_comum, pais_info):
+    # Não confirma a transação: acompanha o commit em lote da inserção
+    with metrics.medir('archive'):
+        models.db.execute(
+            'INSERT OR REPLACE INTO paises_bruto (nome_comum, payload, atualizado_em) VALUES (?, ?, ?)',
+            (nome_comum, compactar(pais_info), datetime.now().isoformat(timespec='seconds')))
+
+def ler_arquivo(tamanho_lote=500):
+    """Gera (nome_comum, pais_info) de todo o arquivo, lendo em blocos para manter a memória constante.
+
+    Cada bloco é uma consulta completa (paginação por chave), então o chamador pode gravar e
+    confirmar transações na mesma conexão entre um bloco e outro.
+    """
+    ultimo = ''
+    while True:
+        linhas = models.db.execute('''
+            SELECT nome_comum, payload FROM paises_bruto
+            WHERE nome_comum > ? ORDER BY nome_comum LIMIT ?''', (ultimo, tamanho_lote)).fetchall()
+        if not linhas:
+            return
+        for nome_comum, payload in linhas:
+            yield nome_comum, descompactar(payload)
+        ultimo = linhas[-1][0]
+
+def _extrair_extras(pais_info, campos):
+    # extrair_campos roda uma vez por país, e só se algum campo pedido vier dele
+    da_ingestao = any(CAMPOS_EXTRAS[campo][1] is None for campo in campos)
+    base = filter.extrair_campos(pais_info) if da_ingestao else {}
+    return {campo: base[campo] if CAMPOS_EXTRAS[campo][1] is None else CAMPOS_EXTRAS[campo][1](pais_info)
+            for campo in campos}
+
+def _colunas_existentes():
+    return {linha[1] for linha in models.db.execute('PRAGMA table_info(paises)')}
+
+def _garantir_colunas(campos):
+    existentes = _colunas_existentes()
+    for campo in campos:
+        if campo not in existentes:
+            tipo = CAMPOS_EXTRAS[campo][0]
+            models.db.execute(f'ALTER TABLE paises ADD COLUMN {campo} {tipo}')
+    models.db.commit()
+
+def reprojetar(campos=None, tamanho_lote=500):
+    """Recalcula colunas de paises a partir do JSON arquivado, sem acessar a API.
+
+    Sem `campos`, reconstrói as colunas extraídas por filtrar_dados; campos de CAMPOS_EXTRAS
+    que ainda não existem na tabela são criados antes.
+    """
+    if campos:
+        desconhecidos = [campo for campo in campos if campo not in CAMPOS_EXTRAS]
+        if desconhecidos:
+            raise ValueError(f"Campos desconhecidos: {', '.join(desconhecidos)} "
+                             f"(disponíveis: {', '.join(sorted(CAMPOS_EXTRAS))})")
+        _garantir_colunas(campos)
+        extrair = lambda pais_info: _extrair_extras(pais_info, campos)
+        colunas = list(campos)
+    else:
+        extrair = filter.extrair_campos
+        colunas = [coluna for coluna in filter.extrair_campos({}) if coluna != 'nome_comum']
+
+    atribuicoes = ', '.join(f'{coluna} = ?' for coluna in colunas)
+    sql = f'UPDATE paises SET {atribuicoes} WHERE nome_comum = ?'
+
+    total = 0
+    lote = []
+    for nome_comum, pais_info in ler_arquivo(tamanho_lote):
+        valores = extrair(pais_info)
+        lote.append([valores[coluna] for coluna in colunas] + [nome_comum])
+        if len(lote) >= tamanho_lote:
+            total += _aplicar(sql, lote)
+            lote = []
+    if lote:
+        total += _aplicar(sql, lote)
+    return total
+
+def _aplicar(sql, lote):
+    with metrics.medir('reproject'):
+        antes = models.db.total_changes
+        models.db.executemany(sql, lote)
+        models.db.commit()
+        return models.db.total_changes - antes
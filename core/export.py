@@ -0,0 +1,98 @@
+import csv
+import json
+import re
+import sys
+
+import models
+
+# Operadores aceitos em --filtro; o valor sempre vai como parâmetro da consulta
+OPERADORES = {'>=': '>=', '<=': '<=', '!=': '!=', '=': '=', '>': '>', '<': '<', '~': 'LIKE'}
+# Um único encoder reaproveitado: json.dumps com opções cria um novo a cada chamada
+_codificar = json.JSONEncoder(ensure_ascii=False).encode
+_FILTRO = re.compile(r'^\s*(\w+)\s*(>=|<=|!=|=|>|<|~)\s*(.*?)\s*$')
+
+def colunas_disponiveis():
+    return [linha[1] for linha in models.db.execute('PRAGMA table_info(paises)')]
+
+def _validar_colunas(colunas, disponiveis):
+    desconhecidas = [coluna for coluna in colunas if coluna not in disponiveis]
+    if desconhecidas:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(desconhecidas)} "
+                         f"(disponíveis: {', '.join(disponiveis)})")
+
+def interpretar_filtro(texto):
+    """Converte 'coluna<op>valor' (ex.: 'populacao>=1000000', 'regiao=Europe', 'nome_comum~Rep%') em tupla"""
+    encontrado = _FILTRO.match(texto)
+    if not encontrado:
+        raise ValueError(f"Filtro inválido: '{texto}' (use coluna=valor, coluna>=valor, coluna~padrão...)")
+    return encontrado.groups()
+
+def consulta(colunas=None, filtros=()):
+    """Monta o SELECT com colunas e filtros validados contra o esquema da tabela paises"""
+    disponiveis = colunas_disponiveis()
+    colunas = list(colunas) if colunas else disponiveis
+    _validar_colunas(colunas, disponiveis)
+    _validar_colunas([coluna for coluna, _, _ in filtros], disponiveis)
+
+    # Nomes de colunas e operadores vêm de listas fixas; só os valores são parâmetros
+    condicoes = [f"{coluna} {OPERADORES[operador]} ?" for coluna, operador, _ in filtros]
+    parametros = [valor for _, _, valor in filtros]
+    sql = f"SELECT {', '.join(colunas)} FROM paises"
+    if condicoes:
+        sql += ' WHERE ' + ' AND '.join(condicoes)
+    return sql + ' ORDER BY id', parametros, colunas
+
+def blocos(sql, parametros, tamanho_lote=1000):
+    """Gera as linhas em listas de até `tamanho_lote`, sem carregar a tabela inteira"""
+    cursor = models.db.execute(sql, parametros)
+    while True:
+        linhas = cursor.fetchmany(tamanho_lote)
+        if not linhas:
+            return
+        yield linhas
+
+def _abrir(saida, compactar):
+    if not compactar:
+        if saida == '-':
+            return sys.stdout, False
+        return open(saida, 'w', encoding='utf-8', newline=''), True
+
+    import gzip
+    import io
+    if saida == '-':
+        binario = gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb', compresslevel=6)
+    else:
+        binario = gzip.open(saida, 'wb', compresslevel=6)
+    return io.TextIOWrapper(binario, encoding='utf-8', newline=''), True
+
+def exportar(formato='csv', saida='-', colunas=None, filtros=(), compactar=None, tamanho_lote=1000):
+    """Exporta a tabela paises em CSV ou JSON Lines, opcionalmente com gzip; '-' escreve na saída padrão.
+
+    As linhas são lidas com fetchmany e escritas bloco a bloco, então a memória usada não depende
+    do tamanho da tabela. Sem `compactar`, o gzip é usado quando a saída termina em '.gz'.
+    """
+    if formato not in ('csv', 'jsonl'):
+        raise ValueError(f"Formato de exportação inválido: {formato}")
+    if compactar is None:
+        compactar = saida.endswith('.gz')
+    sql, parametros, colunas = consulta(colunas, filtros)
+
+    arquivo, fechar = _abrir(saida, compactar)
+    total = 0
+    try:
+        if formato == 'csv':
+            escritor = csv.writer(arquivo)
+            escritor.writerow(colunas)
+            for linhas in blocos(sql, parametros, tamanho_lote):
+                escritor.writerows(linhas)
+                total += len(linhas)
+        else:
+            for linhas in blocos(sql, parametros, tamanho_lote):
+                arquivo.write(''.join(_codificar(dict(zip(colunas, linha))) + '\n' for linha in linhas))
+                total += len(linhas)
+    finally:
+        if fechar:
+            arquivo.close()
+        else:
+            arquivo.flush()
+    return total
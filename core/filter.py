@@ -1,48 +1,109 @@
 from api import api
+from core import lookup_cache, metrics, profiling
 
-def filtrar_dados(pais):
-    dados = api.buscar_pais(pais)
-    
-    if dados:
-        pais_info = None
-        pais_lower = pais.lower().strip()
-        
-        # Procura por correspondência exata no nome pesquisado
-        for p in dados:
-            nome_comum = p.get('name', {}).get('common', '').lower()
-            nome_oficial = p.get('name', {}).get('official', '').lower()
-            
-            # Verifica tradução em português
-            nome_pt = ''
-            translations = p.get('translations', {})
-            if 'por' in translations:
-                nome_pt = translations['por']['common'].lower()
-            
-            # Se encontrar correspondência exata, usa esse país
-            if pais_lower == nome_comum or pais_lower == nome_oficial or pais_lower == nome_pt:
-                pais_info = p
-                break
-        
-        # Se não encontrou correspondência exata, pega o primeiro
-        if not pais_info:
-            pais_info = dados[0]
-        
-        pais_data = {
-            'nome_comum': pais_info.get('name', {}).get('common', ''),
-            'nome_oficial': pais_info.get('name', {}).get('official', ''),
-            'capital': pais_info.get('capital', [''])[0],
-            'continente': pais_info.get('continents', [''])[0],
-            'regiao': pais_info.get('region', ''),
-            'subregiao': pais_info.get('subregion', ''),
-            'populacao': pais_info.get('population', 0),
-            'area': pais_info.get('area', 0.0),
-            'moeda_nome': list(pais_info.get('currencies', {}).values())[0].get('name', '') if pais_info.get('currencies') else '',
-            'moeda_simbolo': list(pais_info.get('currencies', {}).values())[0].get('symbol', '') if pais_info.get('currencies') else '',
-            'idioma_principal': list(pais_info.get('languages', {}).values())[0] if pais_info.get('languages') else '',
-            'fuso_horario': pais_info.get('timezones', [''])[0],
-            'bandeira_url': pais_info.get('flags', {}).get('png', '')
-        }
-        return pais_data
-    
-    print(f"✗ Não foi possível obter dados para '{pais}'")
-    return None
\ No newline at end of file
+def selecionar_pais(pais, dados):
+    pais_info = None
+    pais_lower = pais.lower().strip()
+
+    # Procura por correspondência exata no nome pesquisado
+    for p in dados:
+        nome_comum = p.get('name', {}).get('common', '').lower()
+        nome_oficial = p.get('name', {}).get('official', '').lower()
+
+        # Verifica tradução em português
+        nome_pt = ''
+        translations = p.get('translations', {})
+        if 'por' in translations:
+            nome_pt = translations['por']['common'].lower()
+
+        # Se encontrar correspondência exata, usa esse país
+        if pais_lower == nome_comum or pais_lower == nome_oficial or pais_lower == nome_pt:
+            pais_info = p
+            break
+
+    # Se não encontrou correspondência exata, pega o primeiro
+    if not pais_info:
+        pais_info = dados[0]
+
+    return pais_info
+
+def extrair_campos(pais_info):
+    return {
+        'nome_comum': pais_info.get('name', {}).get('common', ''),
+        'nome_oficial': pais_info.get('name', {}).get('official', ''),
+        'capital': pais_info.get('capital', [''])[0],
+        'continente': pais_info.get('continents', [''])[0],
+        'regiao': pais_info.get('region', ''),
+        'subregiao': pais_info.get('subregion', ''),
+        'populacao': pais_info.get('population', 0),
+        'area': pais_info.get('area', 0.0),
+        'moeda_nome': list(pais_info.get('currencies', {}).values())[0].get('name', '') if pais_info.get('currencies') else '',
+        'moeda_simbolo': list(pais_info.get('currencies', {}).values())[0].get('symbol', '') if pais_info.get('currencies') else '',
+        'idioma_principal': list(pais_info.get('languages', {}).values())[0] if pais_info.get('languages') else '',
+        'fuso_horario': pais_info.get('timezones', [''])[0],
+        'bandeira_url': pais_info.get('flags', {}).get('png', ''),
+        'latitude': (pais_info.get('latlng') or [None, None])[0],
+        'longitude': (pais_info.get('latlng') or [None, None])[1],
+        'fronteiras': ','.join(pais_info.get('borders', [])),
+        'cca2': pais_info.get('cca2', ''),
+        'cca3': pais_info.get('cca3', '')
+    }
+
+def filtrar_dados(pais, avisar=True, com_bruto=False, usar_cache=True):
+    # com_bruto=True devolve (pais_data, json original do país) para o arquivo de payloads
+    # usar_cache=False sempre consulta a API, mas ainda grava a resposta no cache compartilhado
+    return extrair(pais, buscar(pais, usar_cache), avisar, com_bruto)
+
+def buscar(pais, usar_cache=True):
+    """Parte de rede de filtrar_dados: o cache compartilhado e, se preciso, a API.
+
+    Devolve a lista de países da API ([] se os dois endpoints responderam 404), None se não foi
+    encontrado só pelo cassete, ou, do cache, (pais_data, json original) ou False para "não
+    encontrado". Só a lista vazia vira cache negativo. Erros de rede sobem como exceção.
+    """
+    em_cache = lookup_cache.consultar(pais) if usar_cache else None
+    if em_cache is not None:
+        return em_cache
+    with metrics.medir('fetch'), profiling.etapa('fetch'):
+        resposta = api.buscar_pais(pais)
+    if resposta is api.NAO_CONFIRMADO:
+        return None
+    return resposta or []
+
+def extrair(pais, buscado, avisar=True, com_bruto=False):
+    """Parte de CPU de filtrar_dados: escolhe o país na resposta de buscar() e extrai os campos"""
+    if isinstance(buscado, list):
+        resultado = None
+        if buscado:
+            with metrics.medir('filter'), profiling.etapa('filter'):
+                pais_info = selecionar_pais(pais, buscado)
+                resultado = (extrair_campos(pais_info), pais_info)
+        # Só respostas da rede chegam aqui (404 nos dois endpoints também fica em cache)
+        lookup_cache.registrar(pais, resultado)
+    else:
+        resultado = buscado or None
+
+    if resultado:
+        metrics.incrementar('encontrados')
+        return resultado if com_bruto else resultado[0]
+
+    metrics.incrementar('nao_encontrados')
+    if avisar:
+        print(f"✗ Não foi possível obter dados para '{pais}'")
+    return None
+
+def filtrar_codigos(codigos):
+    """Busca vários países por código em uma requisição; devolve {codigo: (pais_data, json original) ou None}"""
+    with metrics.medir('fetch'), profiling.etapa('fetch'):
+        por_codigo = api.buscar_por_codigos(codigos)
+
+    resultado = {}
+    with metrics.medir('filter'), profiling.etapa('filter'):
+        for codigo, pais_info in por_codigo.items():
+            if pais_info is None:
+                metrics.incrementar('nao_encontrados')
+                resultado[codigo] = None
+            else:
+                metrics.incrementar('encontrados')
+                resultado[codigo] = (extrair_campos(pais_info), pais_info)
+    return resultado
@@ -0,0 +1,141 @@
+from collections import deque
+
+import numpy as np
+
+import models
+
+RAIO_TERRA_KM = 6371.0088
+
+
+def _vetores(latitudes, longitudes):
+    # Coordenadas em vetores unitários: a distância angular vira um produto escalar
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+class IndiceGeografico:
+    """Índice em memória das coordenadas e fronteiras dos países cadastrados.
+
+    As coordenadas ficam em uma matriz NumPy (n x 3) de vetores unitários, uma linha por país com
+    coordenadas, então cada consulta espacial é um único produto matriz-vetor sobre todos eles, sem
+    SQL nem laço em Python. As fronteiras, de todos os países, formam um grafo de adjacência por
+    índice, percorrido em largura.
+    """
+
+    def __init__(self, linhas):
+        # linhas: (nome_comum, cca3, latitude, longitude, fronteiras)
+        # Nomes, códigos e fronteiras vêm de todas as linhas; só as consultas espaciais precisam
+        # de coordenadas (linhas anteriores à migração 5 ficam sem elas até o reproject)
+        linhas = list(linhas)
+        self.nomes = [linha[0] for linha in linhas]
+        self.codigos = [linha[1] or '' for linha in linhas]
+        self.latitudes = np.array([np.nan if linha[2] is None else linha[2] for linha in linhas], dtype=np.float64)
+        self.longitudes = np.array([np.nan if linha[3] is None else linha[3] for linha in linhas], dtype=np.float64)
+        # Índices (crescentes) dos países com coordenadas; a linha j de vetores é o país com_coordenadas[j]
+        self.com_coordenadas = np.flatnonzero(~np.isnan(self.latitudes) & ~np.isnan(self.longitudes))
+        self.vetores = _vetores(self.latitudes[self.com_coordenadas],
+                                self.longitudes[self.com_coordenadas]).reshape(-1, 3)
+
+        self._por_nome = {nome.lower(): i for i, nome in enumerate(self.nomes)}
+        self._por_codigo = {codigo.upper(): i for i, codigo in enumerate(self.codigos) if codigo}
+        # Fronteiras para países que não estão no banco são descartadas
+        self.vizinhanca = [
+            [self._por_codigo[codigo] for codigo in (linha[4] or '').split(',') if codigo in self._por_codigo]
+            for linha in linhas
+        ]
+
+    def __len__(self):
+        return len(self.nomes)
+
+    @classmethod
+    def do_banco(cls, db=None):
+        db = db if db is not None else models.db
+        return cls(db.execute(
+            'SELECT nome_comum, cca3, latitude, longitude, fronteiras FROM paises ORDER BY nome_comum'))
+
+    def localizar(self, pais):
+        """Índice do país pelo nome comum ou código cca3; None se não estiver no índice"""
+        indice = self._por_codigo.get(pais.strip().upper())
+        if indice is None:
+            indice = self._por_nome.get(pais.strip().lower())
+        return indice
+
+    def _resultado(self, indices, distancias):
+        return [
+            {'nome_comum': self.nomes[i], 'cca3': self.codigos[i], 'distancia_km': round(float(d), 1)}
+            for i, d in zip(indices, distancias)
+        ]
+
+    def _cossenos(self, latitude, longitude):
+        return self.vetores @ _vetores(latitude, longitude).reshape(3)
+
+    def _posicao(self, indice):
+        # Linha do país em vetores, ou None se ele não tem coordenadas
+        posicao = int(np.searchsorted(self.com_coordenadas, indice))
+        if posicao < len(self.com_coordenadas) and self.com_coordenadas[posicao] == indice:
+            return posicao
+        return None
+
+    def mais_proximos(self, pais, n=5):
+        """Os n países com centro mais próximo do país informado (ele mesmo excluído)"""
+        origem = self.localizar(pais)
+        origem = None if origem is None else self._posicao(origem)
+        if origem is None:
+            return None
+        cossenos = self.vetores @ self.vetores[origem]
+        cossenos[origem] = -2.0
+        n = max(0, min(n, len(self.vetores) - 1))
+        if n == 0:
+            return []
+        # argpartition seleciona os n maiores em O(n); só eles são ordenados
+        candidatos = np.argpartition(-cossenos, n - 1)[:n]
+        candidatos = candidatos[np.argsort(-cossenos[candidatos])]
+        return self._resultado(self.com_coordenadas[candidatos],
+                               np.arccos(np.clip(cossenos[candidatos], -1.0, 1.0)) * RAIO_TERRA_KM)
+
+    def no_raio(self, latitude, longitude, raio_km):
+        """Países cujo centro está a até raio_km do ponto, do mais próximo ao mais distante"""
+        if not raio_km >= 0:
+            # cos(-x) == cos(x): um raio negativo seria tratado como positivo, e NaN não filtra nada
+            raise ValueError(f"Raio inválido: {raio_km}")
+        cossenos = self._cossenos(latitude, longitude)
+        # Compara cossenos em vez de distâncias: arccos só é calculado para quem passou no filtro
+        limite = np.cos(min(raio_km / RAIO_TERRA_KM, np.pi))
+        dentro = np.flatnonzero(cossenos >= limite)
+        dentro = dentro[np.argsort(-cossenos[dentro])]
+        return self._resultado(self.com_coordenadas[dentro],
+                               np.arccos(np.clip(cossenos[dentro], -1.0, 1.0)) * RAIO_TERRA_KM)
+
+    def vizinhos(self, pais, k=1):
+        """Países a até k fronteiras de distância, com o número de saltos de cada um"""
+        origem = self.localizar(pais)
+        if origem is None:
+            return None
+        saltos = {origem: 0}
+        fila = deque([origem])
+        while fila:
+            atual = fila.popleft()
+            if saltos[atual] == k:
+                continue
+            for vizinho in self.vizinhanca[atual]:
+                if vizinho not in saltos:
+                    saltos[vizinho] = saltos[atual] + 1
+                    fila.append(vizinho)
+        del saltos[origem]
+        return [
+            {'nome_comum': self.nomes[i], 'cca3': self.codigos[i], 'saltos': s}
+            for i, s in sorted(saltos.items(), key=lambda item: (item[1], self.nomes[item[0]]))
+        ]
+
+
+_indice = None
+
+
+def indice(recarregar=False):
+    """Índice da conexão padrão, montado no primeiro uso"""
+    global _indice
+    if _indice is None or recarregar:
+        _indice = IndiceGeografico.do_banco()
+    return _indice
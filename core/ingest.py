@@ -0,0 +1,328 @@
+import sys
+import time
+from collections import deque
+
+import models
+from api import deadline
+from core import filter, input, insert, journal, metrics, pipeline, profiling
+
+# Tempo máximo, em segundos, entre commits da ingestão enquanto os itens chegam sem pausa
+INTERVALO_COMMIT = 1.0
+
+class Progresso:
+    # Linha de progresso/vazão reescrita no stderr (apenas em terminal interativo)
+    def __init__(self, total=None, saida=sys.stderr, intervalo=0.5, prefixo='', interativo=None):
+        self.total = total
+        self.saida = saida
+        self.intervalo = intervalo
+        self.prefixo = prefixo
+        self.ativo = saida.isatty() if interativo is None else interativo
+        self.inicio = time.perf_counter()
+        self.ultimo = 0.0
+        self.contagem = {'processados': 0, 'inseridos': 0, 'atualizados': 0, 'duplicados': 0, 'falhas': 0,
+                         'adiados': 0}
+
+    def registrar(self, evento):
+        self.contagem['processados'] += 1
+        self.contagem[evento] += 1
+        agora = time.perf_counter()
+        if self.ativo and agora - self.ultimo >= self.intervalo:
+            self.ultimo = agora
+            self.saida.write('\r' + self._linha(agora))
+            self.saida.flush()
+
+    def adiar(self, quantidade=1):
+        # Nomes que ficaram para a próxima execução porque o prazo acabou (não contam como processados)
+        self.contagem['adiados'] += quantidade
+
+    def _linha(self, agora):
+        decorrido = agora - self.inicio
+        taxa = self.contagem['processados'] / decorrido if decorrido else 0.0
+        total = f"/{self.total}" if self.total else ''
+        adiados = f" ⏸ {self.contagem['adiados']}" if self.contagem['adiados'] else ''
+        return (f"{self.prefixo}{self.contagem['processados']}{total} processados | {taxa:.1f}/s | "
+                f"✓ {self.contagem['inseridos'] + self.contagem['atualizados']} "
+                f"⚠ {self.contagem['duplicados']} ✗ {self.contagem['falhas']}{adiados}")
+
+    def finalizar(self):
+        agora = time.perf_counter()
+        if self.ativo:
+            self.saida.write('\r')
+        self.saida.write(self._linha(agora) + f" | {agora - self.inicio:.1f}s\n")
+        self.saida.flush()
+
+def processar_em_paralelo(funcao, itens, workers):
+    """Aplica funcao a cada item com até `workers` threads, devolvendo (item, resultado, erro) na ordem de entrada"""
+    if workers <= 1:
+        for item in itens:
+            try:
+                yield item, funcao(item), None
+            except Exception as erro:
+                yield item, None, erro
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Janela limitada de tarefas em andamento para não carregar a entrada inteira em memória
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pendentes = deque()
+    limite = workers * 4
+    try:
+        for item in itens:
+            pendentes.append((item, executor.submit(funcao, item)))
+            if len(pendentes) >= limite:
+                yield _colher(*pendentes.popleft())
+        while pendentes:
+            yield _colher(*pendentes.popleft())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _colher(item, futuro):
+    try:
+        return item, futuro.result(), None
+    except Exception as erro:
+        return item, None, erro
+
+def medir_entrada(itens):
+    """Repassa os itens medindo cada leitura (arquivo ou jornal) como a etapa 'input'"""
+    itens = iter(itens)
+    while True:
+        with metrics.medir('input'), profiling.etapa('input'):
+            item = next(itens, None)
+        if item is None:
+            return
+        yield item
+
+class Variantes:
+    # Guarda as grafias originais de cada nome canônico para dar a cada entrada sua linha de status
+    def __init__(self):
+        self.por_nome = {}
+
+    def canonizar(self, nomes):
+        for original in nomes:
+            nome = input.canonizar(original)
+            if not nome:
+                continue
+            contagem = self.por_nome.setdefault(nome, {})
+            contagem[original] = contagem.get(original, 0) + 1
+            if sum(contagem.values()) > 1:
+                metrics.incrementar('deduplicados')
+            yield nome
+
+    def adicionar(self, nome, originais):
+        # Nome já canônico, com as grafias que o geraram (ex.: recebido de outro processo)
+        contagem = self.por_nome.setdefault(nome, {})
+        for original in originais:
+            contagem[original] = contagem.get(original, 0) + 1
+
+    def de(self, nome):
+        # Sem registro (ex.: retomada pelo jornal), o próprio nome canônico é a entrada
+        contagem = self.por_nome.pop(nome, None)
+        if not contagem:
+            return [nome]
+        return [original for original, vezes in contagem.items() for _ in range(vezes)]
+
+def etapa_busca(nome):
+    """Etapa de rede do pipeline: devolve (nome, resposta de filter.buscar ou None, erro ou None).
+
+    Erros de um nome viram parte do item; só o prazo esgotado interrompe o pipeline inteiro.
+    """
+    try:
+        return nome, filter.buscar(nome), None
+    except deadline.PrazoEsgotado:
+        raise
+    except Exception as erro:
+        return nome, None, erro
+
+def etapa_extracao(item):
+    # Etapa de CPU: (nome, (pais_data, json original) ou None, erro)
+    nome, buscado, erro = item
+    if erro is not None:
+        return item
+    return nome, filter.extrair(nome, buscado, avisar=False, com_bruto=True), None
+
+def _pendentes(max_tentativas):
+    # Roda na thread de entrada do pipeline; a conexão SQLite principal pertence à thread que grava
+    import sqlite3
+    db = sqlite3.connect(models.caminho, timeout=models.ESPERA_TRAVA)
+    try:
+        yield from medir_entrada(journal.pendentes(max_tentativas, db=db))
+    finally:
+        db.close()
+
+def _registrar_em_lotes(entrada, variantes, tamanho_lote):
+    # Roda na thread de entrada: cada lote é registrado no jornal e logo entregue à busca, sem
+    # esperar o fim da entrada. Usa conexão própria, como _pendentes
+    import sqlite3
+    db = sqlite3.connect(models.caminho, timeout=models.ESPERA_TRAVA)
+    try:
+        lote = []
+        for nome, originais in medir_entrada(entrada):
+            variantes.adicionar(nome, originais)
+            lote.append(nome)
+            if len(lote) >= tamanho_lote:
+                journal.registrar(lote, db=db)
+                yield from lote
+                lote = []
+        if lote:
+            journal.registrar(lote, db=db)
+            yield from lote
+    finally:
+        db.close()
+
+def ingerir(nomes=None, workers=1, tamanho_lote=50, progresso=None, max_tentativas=3, entrada=None):
+    """Registra os nomes no jornal e processa os pendentes e as falhas que podem ser refeitas.
+
+    Os nomes são canonizados antes do registro, então repetições com outra caixa ou espaçamento
+    geram uma única busca. Nomes de uma nova entrada são sempre buscados de novo, mesmo que uma
+    execução anterior já os tenha concluído; com nomes=None, apenas retoma o que ficou pendente. A cada
+    `tamanho_lote` nomes processados, a cada INTERVALO_COMMIT segundos e sempre que a gravação
+    fica esperando a rede, as inserções e o jornal são confirmados na mesma transação: a trava de
+    escrita do SQLite não fica presa durante as buscas, e outros processos podem gravar no banco.
+
+    Leitura do jornal, busca (`workers` threads), extração e gravação são etapas de um
+    pipeline.Pipeline ligadas por filas limitadas; a gravação fica na thread que chamou, dona da
+    conexão SQLite. Os nomes são concluídos na ordem em que as buscas terminam.
+
+    Se o prazo da execução (api.deadline) acabar, o pipeline para e os nomes que ainda não foram
+    gravados continuam pendentes no jornal, contados como adiados.
+
+    `entrada` (usada pelos shards) substitui `nomes` e a leitura do jornal: pares (nome canônico,
+    grafias originais) já deduplicados, registrados em lotes de `tamanho_lote` à medida que chegam
+    e buscados em seguida, enquanto o resto da entrada ainda está sendo recebido.
+    """
+    variantes = Variantes()
+    if nomes is not None:
+        journal.registrar(variantes.canonizar(medir_entrada(nomes)))
+
+    progresso = progresso or Progresso()
+    registro = journal.Jornal()
+    estado = {'nao_confirmados': 0, 'confirmado_em': time.monotonic()}
+
+    def confirmar():
+        if estado['nao_confirmados']:
+            registro.gravar()
+            insert.confirmar()
+            estado['nao_confirmados'] = 0
+        estado['confirmado_em'] = time.monotonic()
+
+    def gravar(item):
+        nome, resultado, erro = item
+        pais_data, bruto = resultado or (None, None)
+        originais = variantes.de(nome)
+        if erro is not None:
+            metrics.incrementar('erros_fetch')
+            registro.marcar(nome, journal.FALHOU, str(erro), retentavel=True)
+            for original in originais:
+                print(f"✗ Erro ao buscar '{original}': {erro}")
+                progresso.registrar('falhas')
+        elif pais_data is None:
+            registro.marcar(nome, journal.FALHOU, 'não encontrado', retentavel=False)
+            for original in originais:
+                print(f"✗ Não foi possível obter dados para '{original}'")
+                progresso.registrar('falhas')
+        else:
+            registro.marcar(nome, journal.CONCLUIDO)
+            # Só a primeira entrada pode inserir; as demais são reportadas como duplicatas
+            for original in originais:
+                if insert.insert_pais(pais_data, original, commit=False, bruto=bruto):
+                    progresso.registrar('inseridos')
+                else:
+                    progresso.registrar('duplicados')
+
+        estado['nao_confirmados'] += 1
+        if (estado['nao_confirmados'] >= tamanho_lote
+                or time.monotonic() - estado['confirmado_em'] >= INTERVALO_COMMIT):
+            confirmar()
+        deadline.verificar('os próximos nomes')
+
+    paralelismo = pipeline.paralelismo_do_ambiente({'fetch': workers, 'extracao': 1})
+    fluxo = pipeline.Pipeline([
+        pipeline.Etapa('fetch', etapa_busca, paralelismo['fetch'], capacidade=workers * 4),
+        pipeline.Etapa('extracao', etapa_extracao, paralelismo['extracao']),
+        pipeline.Etapa('insert', gravar, ocioso=confirmar),
+    ])
+    prazo_esgotado = False
+    try:
+        fonte = _pendentes(max_tentativas) if entrada is None else _registrar_em_lotes(entrada, variantes, tamanho_lote)
+        fluxo.executar(fonte)
+    except deadline.PrazoEsgotado:
+        # Os itens ainda nas filas são descartados sem marcar o jornal: continuam pendentes
+        prazo_esgotado = True
+    finally:
+        # Mesmo interrompido, o que já foi processado é confirmado; o resto continua pendente
+        registro.gravar()
+        insert.confirmar()
+        if prazo_esgotado:
+            # As falhas desta execução já contam como falhas, não como adiadas
+            progresso.adiar(journal.contar_pendentes(max_tentativas, excluir=registro.refazer))
+            print(f"⏸ Prazo esgotado: {progresso.contagem['adiados']} nomes adiados "
+                  f"(continuam pendentes no jornal; retome com --resume)")
+        progresso.finalizar()
+    return progresso.contagem
+
+def paises_cadastrados():
+    # (nome_comum, código) de cada país; o código fica vazio para linhas anteriores à coluna cca3
+    models.cursor.execute("SELECT nome_comum, COALESCE(NULLIF(cca3, ''), cca2, '') FROM paises ORDER BY id")
+    return models.cursor.fetchall()
+
+def _buscar_atualizacoes(cadastrados, workers, lote_codigos):
+    """Gera (nome, (pais_data, bruto) ou None, erro) de todos os países cadastrados.
+
+    Países com código são buscados em lotes de `lote_codigos` pelo /alpha?codes=, e o
+    resultado de cada lote é distribuído de volta aos nomes; os demais, um a um pelo nome.
+    """
+    com_codigo = [(nome, codigo) for nome, codigo in cadastrados if codigo]
+    lotes = [com_codigo[i:i + lote_codigos] for i in range(0, len(com_codigo), lote_codigos)]
+    buscar_lote = lambda lote: filter.filtrar_codigos([codigo for _, codigo in lote])
+
+    for lote, por_codigo, erro in processar_em_paralelo(buscar_lote, lotes, workers):
+        for nome, codigo in lote:
+            yield nome, None if erro is not None else por_codigo.get(codigo), erro
+
+    # A atualização existe para trazer dados novos, então não lê do cache compartilhado
+    sem_codigo = [nome for nome, codigo in cadastrados if not codigo]
+    buscar_nome = lambda nome: filter.filtrar_dados(nome, avisar=False, com_bruto=True, usar_cache=False)
+    yield from processar_em_paralelo(buscar_nome, sem_codigo, workers)
+
+def atualizar(workers=1, tamanho_lote=50, progresso=None, lote_codigos=50):
+    """Busca novamente todos os países já cadastrados e atualiza seus dados"""
+    cadastrados = paises_cadastrados()
+    progresso = progresso or Progresso(total=len(cadastrados))
+    nao_confirmados = 0
+    vistos = 0
+    try:
+        for nome, resultado, erro in _buscar_atualizacoes(cadastrados, workers, lote_codigos):
+            pais_data, bruto = resultado or (None, None)
+            if isinstance(erro, deadline.PrazoEsgotado):
+                # Sair do laço cancela as buscas restantes; nada é gravado para os adiados
+                progresso.adiar(len(cadastrados) - vistos)
+                print(f"⏸ Prazo esgotado: {progresso.contagem['adiados']} países adiados para a próxima atualização")
+                break
+            vistos += 1
+            if erro is not None:
+                metrics.incrementar('erros_fetch')
+                print(f"✗ Erro ao buscar '{nome}': {erro}")
+                progresso.registrar('falhas')
+                continue
+            if pais_data is None:
+                print(f"✗ Não foi possível obter dados para '{nome}'")
+                progresso.registrar('falhas')
+                continue
+
+            # A busca pode devolver outro nome comum; atualiza sempre a linha original
+            pais_data['nome_comum'] = nome
+            if insert.atualizar_pais(pais_data, commit=False, bruto=bruto):
+                print(f"✓ País '{nome}' atualizado com sucesso!")
+                nao_confirmados += 1
+                progresso.registrar('atualizados')
+            else:
+                progresso.registrar('falhas')
+
+            if nao_confirmados >= tamanho_lote:
+                insert.confirmar()
+                nao_confirmados = 0
+    finally:
+        insert.confirmar()
+        progresso.finalizar()
+    return progresso.contagem
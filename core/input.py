@@ -1,8 +1,29 @@
+import sys
+
+# A canonização fica junto da API, que também a usa e não depende de core
+from api.nomes import canonizar
+
 def obter_paises():
-    paises = []
+    return list(gerar_paises())
+
+def gerar_paises(quantidade=3):
+    # Entrega cada nome assim que é digitado, para a busca começar antes do próximo
     cont = 1
-    while cont <= 3:
+    while cont <= quantidade:
         pais = input(f'Digite o nome completo do {cont}º país que deseja buscar: ').lower()
-        paises.append(pais)
+        yield pais
         cont += 1
-    return paises
+
+def ler_arquivo(caminho):
+    # Um país por linha; linhas vazias e comentários (#) são ignorados.
+    # '-' lê da entrada padrão. Gera os nomes sob demanda para não carregar o arquivo inteiro.
+    arquivo = sys.stdin if caminho == '-' else open(caminho, encoding='utf-8')
+    try:
+        for linha in arquivo:
+            pais = linha.strip()
+            if pais and not pais.startswith('#'):
+                yield pais
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+
@@ -1,30 +1,78 @@
-from models import db, cursor
-
-def insert_pais(pais_data, nome_buscado):
-    # Verifica se o país já existe
-    cursor.execute('SELECT id FROM paises WHERE nome_comum = ?', (pais_data['nome_comum'],))
-    pais_existente = cursor.fetchone()
-    
-    if pais_existente:
+import models
+from core import archive, metrics, profiling
+
+def insert_pais(pais_data, nome_buscado, commit=True, bruto=None):
+    with metrics.medir('insert'), profiling.etapa('insert'):
+        inserido = _insert_pais(pais_data, bruto, commit)
+
+    if not inserido:
+        metrics.incrementar('duplicados')
         print(f"⚠ País '{nome_buscado}' já existe no banco de dados!")
         return False  # País já existe, não insere
-    
-    # Se não existe, insere o país
+
+    metrics.incrementar('inseridos')
+    print(f"✓ País '{nome_buscado}' inserido com sucesso!")
+    return True  # País inserido com sucesso
+
+def _insert_pais(pais_data, bruto, commit):
+    cursor = models.cursor
+
+    # A verificação de duplicata faz parte do INSERT: roda sob a trava de escrita, então outro
+    # processo gravando no mesmo banco não consegue inserir o mesmo país entre a consulta e a inserção
     cursor.execute('''
         INSERT INTO paises (
             nome_comum, nome_oficial, capital, continente, regiao,
             subregiao, populacao, area, moeda_nome, moeda_simbolo,
-            idioma_principal, fuso_horario, bandeira_url)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
+            idioma_principal, fuso_horario, bandeira_url,
+            latitude, longitude, fronteiras, cca2, cca3)
+        SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM paises WHERE nome_comum = ?)''', (
             pais_data['nome_comum'], pais_data['nome_oficial'], pais_data['capital'],
             pais_data['continente'], pais_data['regiao'], pais_data['subregiao'],
             pais_data['populacao'], pais_data['area'], pais_data['moeda_nome'],
             pais_data['moeda_simbolo'], pais_data['idioma_principal'],
-            pais_data['fuso_horario'], pais_data['bandeira_url']
+            pais_data['fuso_horario'], pais_data['bandeira_url'],
+            pais_data['latitude'], pais_data['longitude'], pais_data['fronteiras'],
+            pais_data['cca2'], pais_data['cca3'], pais_data['nome_comum']
         ))
-    db.commit()
-    print(f"✓ País '{nome_buscado}' inserido com sucesso!")
-    return True  # País inserido com sucesso
+    if cursor.rowcount == 0:
+        return False  # País já existe
+
+    if bruto is not None:
+        archive.arquivar(pais_data['nome_comum'], bruto)
+    if commit:
+        confirmar()
+    return True
+
+def atualizar_pais(pais_data, commit=True, bruto=None):
+    # Atualiza os dados de um país já cadastrado (usado pelo refresh)
+    with metrics.medir('insert'), profiling.etapa('insert'):
+        models.cursor.execute('''
+            UPDATE paises SET
+                nome_oficial = ?, capital = ?, continente = ?, regiao = ?,
+                subregiao = ?, populacao = ?, area = ?, moeda_nome = ?,
+                moeda_simbolo = ?, idioma_principal = ?, fuso_horario = ?,
+                bandeira_url = ?, latitude = ?, longitude = ?, fronteiras = ?,
+                cca2 = ?, cca3 = ?
+            WHERE nome_comum = ?''', (
+                pais_data['nome_oficial'], pais_data['capital'], pais_data['continente'],
+                pais_data['regiao'], pais_data['subregiao'], pais_data['populacao'],
+                pais_data['area'], pais_data['moeda_nome'], pais_data['moeda_simbolo'],
+                pais_data['idioma_principal'], pais_data['fuso_horario'],
+                pais_data['bandeira_url'], pais_data['latitude'], pais_data['longitude'],
+                pais_data['fronteiras'], pais_data['cca2'], pais_data['cca3'],
+                pais_data['nome_comum']
+            ))
+        atualizado = models.cursor.rowcount > 0
+        if atualizado and bruto is not None:
+            archive.arquivar(pais_data['nome_comum'], bruto)
+        if commit:
+            confirmar()
+    return atualizado
+
+def confirmar():
+    with metrics.medir('commit'):
+        models.db.commit()
 
 def fechar_conexao():
-    db.close()
\ No newline at end of file
+    models.fechar()
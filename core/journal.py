@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import models
+
+PENDENTE = 'pendente'
+CONCLUIDO = 'concluido'
+FALHOU = 'falhou'
+
+def registrar(nomes, tamanho_lote=500, db=None):
+    """Registra os nomes de uma nova entrada como pendentes.
+
+    Nomes que já estavam no jornal (concluídos ou com falha em execuções anteriores) voltam a
+    pendente com as tentativas zeradas: uma nova entrada sempre é processada por inteiro, e só a
+    retomada (pendentes() sem registrar) pula o que já foi feito.
+    """
+    db = db if db is not None else models.db
+    total = 0
+    lote = []
+    for nome in nomes:
+        lote.append((nome,))
+        if len(lote) >= tamanho_lote:
+            total += _registrar_lote(db, lote)
+            lote = []
+    if lote:
+        total += _registrar_lote(db, lote)
+    return total
+
+def _registrar_lote(db, lote):
+    antes = db.total_changes
+    db.executemany(f'''
+        INSERT INTO jornal_ingestao (nome) VALUES (?)
+        ON CONFLICT(nome) DO UPDATE SET status = '{PENDENTE}', tentativas = 0, retentavel = 1, erro = NULL''', lote)
+    db.commit()
+    return db.total_changes - antes
+
+# Nomes que uma retomada ainda buscaria: pendentes e falhas que podem ser refeitas
+_CONDICAO_PENDENTE = 'status = ? OR (status = ? AND retentavel = 1 AND tentativas < ?)'
+
+def pendentes(max_tentativas=3, tamanho_lote=500, db=None):
+    """Gera, na ordem de registro, os nomes pendentes e as falhas que ainda podem ser refeitas"""
+    db = db if db is not None else models.db
+    ultimo = 0
+    while True:
+        linhas = db.execute(f'''
+            SELECT rowid, nome FROM jornal_ingestao
+            WHERE rowid > ? AND ({_CONDICAO_PENDENTE})
+            ORDER BY rowid LIMIT ?''', (ultimo, PENDENTE, FALHOU, max_tentativas, tamanho_lote)).fetchall()
+        if not linhas:
+            return
+        for rowid, nome in linhas:
+            yield nome
+        ultimo = linhas[-1][0]
+
+def contar_pendentes(max_tentativas=3, excluir=(), tamanho_lote=500):
+    """Quantos nomes uma retomada ainda buscaria, sem contar os de `excluir` (ex.: falhas desta execução)"""
+    total = models.db.execute(f'SELECT COUNT(*) FROM jornal_ingestao WHERE {_CONDICAO_PENDENTE}',
+                              (PENDENTE, FALHOU, max_tentativas)).fetchone()[0]
+    excluir = list(excluir)
+    for inicio in range(0, len(excluir), tamanho_lote):
+        lote = excluir[inicio:inicio + tamanho_lote]
+        total -= models.db.execute(f'''
+            SELECT COUNT(*) FROM jornal_ingestao
+            WHERE nome IN ({', '.join('?' * len(lote))}) AND ({_CONDICAO_PENDENTE})''',
+            (*lote, PENDENTE, FALHOU, max_tentativas)).fetchone()[0]
+    return total
+
+class Jornal:
+    # Acumula as mudanças de status e grava tudo de uma vez, junto com o commit dos dados
+    def __init__(self):
+        self.buffer = []
+        # Falhas desta execução que uma retomada refaria (não são adiamentos)
+        self.refazer = set()
+
+    def marcar(self, nome, status, erro=None, retentavel=True):
+        if status == FALHOU and retentavel:
+            self.refazer.add(nome)
+        self.buffer.append((status, 1 if retentavel else 0, erro, datetime.now().isoformat(timespec='seconds'), nome))
+
+    def gravar(self):
+        if not self.buffer:
+            return
+        models.db.executemany('''
+            UPDATE jornal_ingestao
+            SET status = ?, tentativas = tentativas + 1, retentavel = ?, erro = ?, atualizado_em = ?
+            WHERE nome = ?''', self.buffer)
+        self.buffer = []
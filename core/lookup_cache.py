@@ -0,0 +1,320 @@
+"""Cache de consultas compartilhado entre processos, em um arquivo mapeado em memória.
+
+Formato do arquivo (little-endian):
+    cabeçalho (64 bytes) | tabela hash (num_slots x 16 bytes) | registros (só acrescentados)
+
+Cada slot guarda (hash da chave, posição do registro); cada registro guarda a chave, o tipo
+(encontrado ou não encontrado), o instante em que foi gravado e o valor compactado. Leituras não
+usam trava: o registro é escrito antes do slot que aponta para ele e a chave é sempre conferida.
+Gravações usam flock em um arquivo de trava ao lado; quando a área de registros ou a tabela
+enche, o arquivo é compactado em um novo e trocado com os.replace, e os leitores remapeiam.
+"""
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from core import input, metrics
+
+try:
+    import fcntl
+except ImportError:
+    # flock só existe em sistemas Unix; sem ele o cache compartilhado fica desligado
+    fcntl = None
+
+MAGICO = b'RPAC'
+VERSAO = 1
+CABECALHO = struct.Struct('<4sIIIQQQQ')  # mágico, versão, slots, reservado, tamanho, fim, registros, mortos
+TAMANHO_CABECALHO = 64
+SLOT = struct.Struct('<QQ')  # hash, posição
+REGISTRO = struct.Struct('<IIBQ')  # tamanho da chave, tamanho do valor, tipo, gravado_em
+
+ENCONTRADO = 1
+NAO_ENCONTRADO = 2
+
+SLOTS_MINIMO = 4096
+DADOS_MINIMO = 4 * 1024 * 1024
+CARGA_MAXIMA = 0.7
+
+# Intervalo mínimo entre verificações de troca do arquivo (compactação por outro processo)
+INTERVALO_VERIFICACAO = 0.5
+
+
+def _hash(chave):
+    # 0 marca slot vazio
+    return int.from_bytes(hashlib.blake2b(chave, digest_size=8).digest(), 'little') or 1
+
+
+def _criar(caminho, num_slots, capacidade_dados, registros=()):
+    """Escreve um arquivo novo com os registros (chave, tipo, gravado_em, valor) e troca o atual"""
+    inicio_dados = TAMANHO_CABECALHO + num_slots * SLOT.size
+    tamanho = inicio_dados + capacidade_dados
+    conteudo = bytearray(tamanho)
+    posicao = inicio_dados
+    total = 0
+    for chave, tipo, gravado_em, valor in registros:
+        REGISTRO.pack_into(conteudo, posicao, len(chave), len(valor), tipo, gravado_em)
+        inicio = posicao + REGISTRO.size
+        conteudo[inicio:inicio + len(chave)] = chave
+        conteudo[inicio + len(chave):inicio + len(chave) + len(valor)] = valor
+        codigo = _hash(chave)
+        indice = codigo % num_slots
+        while SLOT.unpack_from(conteudo, TAMANHO_CABECALHO + indice * SLOT.size)[1]:
+            indice = (indice + 1) % num_slots
+        SLOT.pack_into(conteudo, TAMANHO_CABECALHO + indice * SLOT.size, codigo, posicao)
+        posicao = inicio + len(chave) + len(valor)
+        total += 1
+    CABECALHO.pack_into(conteudo, 0, MAGICO, VERSAO, num_slots, 0, tamanho, posicao, total, 0)
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+class CacheCompartilhado:
+    def __init__(self, caminho, ttl_encontrado=7 * 86400, ttl_nao_encontrado=86400):
+        self.caminho = caminho
+        self.ttl = {ENCONTRADO: ttl_encontrado, NAO_ENCONTRADO: ttl_nao_encontrado}
+        self._lock = threading.Lock()
+        self._mapa = None
+        self._inode = None
+        self._verificado_em = 0.0
+
+        pasta = os.path.dirname(caminho)
+        if pasta and not os.path.exists(pasta):
+            os.makedirs(pasta, exist_ok=True)
+        self._trava = open(caminho + '.lock', 'a+b')
+        with self._exclusivo():
+            if not os.path.exists(caminho):
+                _criar(caminho, SLOTS_MINIMO, DADOS_MINIMO)
+            self._mapear()
+
+    # --- mapeamento ---
+
+    @contextlib.contextmanager
+    def _exclusivo(self):
+        # Trava entre processos, em arquivo separado porque o arquivo de dados é trocado na compactação
+        fcntl.flock(self._trava.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._trava.fileno(), fcntl.LOCK_UN)
+
+    def _mapear(self):
+        if self._mapa is not None:
+            self._mapa.close()
+        with open(self.caminho, 'r+b') as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0)
+            self._inode = os.fstat(arquivo.fileno()).st_ino
+        magico, versao, self.num_slots = CABECALHO.unpack_from(self._mapa, 0)[:3]
+        if magico != MAGICO or versao != VERSAO:
+            raise ValueError(f"Arquivo de cache inválido: {self.caminho}")
+        self._verificado_em = time.monotonic()
+
+    def _verificar_troca(self, forcar=False):
+        # Outro processo pode ter compactado e trocado o arquivo; o mapa antigo continua válido até aqui
+        agora = time.monotonic()
+        if not forcar and agora - self._verificado_em < INTERVALO_VERIFICACAO:
+            return
+        self._verificado_em = agora
+        try:
+            inode = os.stat(self.caminho).st_ino
+        except FileNotFoundError:
+            return
+        if inode != self._inode:
+            self._mapear()
+
+    def _cabecalho(self):
+        return CABECALHO.unpack_from(self._mapa, 0)
+
+    # --- leitura ---
+
+    def _procurar(self, chave, codigo):
+        """Devolve (índice do slot, posição do registro) da chave, ou (slot vazio, 0)"""
+        mapa = self._mapa
+        inicio_dados = TAMANHO_CABECALHO + self.num_slots * SLOT.size
+        indice = codigo % self.num_slots
+        for _ in range(self.num_slots):
+            base = TAMANHO_CABECALHO + indice * SLOT.size
+            valor_hash, posicao = SLOT.unpack_from(mapa, base)
+            if not valor_hash:
+                return indice, 0
+            # A posição é conferida porque um leitor sem trava pode ver um slot sendo escrito
+            if valor_hash == codigo and inicio_dados <= posicao < len(mapa) - REGISTRO.size:
+                tamanho_chave = REGISTRO.unpack_from(mapa, posicao)[0]
+                inicio = posicao + REGISTRO.size
+                if mapa[inicio:inicio + tamanho_chave] == chave:
+                    return indice, posicao
+            indice = (indice + 1) % self.num_slots
+        return None, 0
+
+    def obter(self, chave):
+        """Devolve (tipo, valor em bytes) ou None se a chave não existe ou expirou"""
+        with self._lock:
+            self._verificar_troca()
+            _, posicao = self._procurar(chave, _hash(chave))
+            if not posicao:
+                return None
+            tamanho_chave, tamanho_valor, tipo, gravado_em = REGISTRO.unpack_from(self._mapa, posicao)
+            if self._expirado(tipo, gravado_em):
+                return None
+            # Lido direto do mapa compartilhado, sem chamada de sistema
+            inicio = posicao + REGISTRO.size + tamanho_chave
+            return tipo, self._mapa[inicio:inicio + tamanho_valor]
+
+    def _expirado(self, tipo, gravado_em, agora=None):
+        ttl = self.ttl.get(tipo)
+        return bool(ttl) and (agora or time.time()) - gravado_em > ttl
+
+    # --- escrita ---
+
+    def guardar(self, chave, tipo, valor=b''):
+        tamanho_registro = REGISTRO.size + len(chave) + len(valor)
+        with self._lock, self._exclusivo():
+            self._verificar_troca(forcar=True)
+            _, _, num_slots, _, tamanho, fim, registros, mortos = self._cabecalho()
+            sem_espaco = fim + tamanho_registro > tamanho or registros + 1 > num_slots * CARGA_MAXIMA
+            # Versões substituídas ocupando mais da metade dos dados também disparam a compactação
+            inicio_dados = TAMANHO_CABECALHO + num_slots * SLOT.size
+            muitos_mortos = mortos > DADOS_MINIMO // 2 and mortos * 2 > fim - inicio_dados
+            if sem_espaco or muitos_mortos:
+                self._compactar(tamanho_registro)
+                _, _, num_slots, _, tamanho, fim, registros, mortos = self._cabecalho()
+
+            codigo = _hash(chave)
+            indice, anterior = self._procurar(chave, codigo)
+            mapa = self._mapa
+            # Primeiro o registro, depois o slot: um leitor nunca vê um slot apontando para lixo
+            REGISTRO.pack_into(mapa, fim, len(chave), len(valor), tipo, int(time.time()))
+            inicio = fim + REGISTRO.size
+            mapa[inicio:inicio + len(chave)] = chave
+            mapa[inicio + len(chave):inicio + len(chave) + len(valor)] = valor
+            base = TAMANHO_CABECALHO + indice * SLOT.size
+            if anterior:
+                tamanho_chave, tamanho_valor = REGISTRO.unpack_from(mapa, anterior)[:2]
+                mortos += REGISTRO.size + tamanho_chave + tamanho_valor
+                struct.pack_into('<Q', mapa, base + 8, fim)
+            else:
+                struct.pack_into('<Q', mapa, base + 8, fim)
+                struct.pack_into('<Q', mapa, base, codigo)
+                registros += 1
+            CABECALHO.pack_into(mapa, 0, MAGICO, VERSAO, num_slots, 0, tamanho,
+                                fim + tamanho_registro, registros, mortos)
+
+    def compactar(self):
+        """Reescreve o arquivo só com os registros vigentes (sem versões antigas nem expirados)"""
+        with self._lock, self._exclusivo():
+            self._verificar_troca(forcar=True)
+            return self._compactar(0)
+
+    def _compactar(self, reserva):
+        agora = time.time()
+        vivos = []
+        for indice in range(self.num_slots):
+            valor_hash, posicao = SLOT.unpack_from(self._mapa, TAMANHO_CABECALHO + indice * SLOT.size)
+            if not valor_hash or not posicao:
+                continue
+            tamanho_chave, tamanho_valor, tipo, gravado_em = REGISTRO.unpack_from(self._mapa, posicao)
+            if self._expirado(tipo, gravado_em, agora):
+                continue
+            inicio = posicao + REGISTRO.size
+            vivos.append((bytes(self._mapa[inicio:inicio + tamanho_chave]), tipo, gravado_em,
+                          bytes(self._mapa[inicio + tamanho_chave:inicio + tamanho_chave + tamanho_valor])))
+
+        # Dobra a tabela e a área de dados sempre que o que sobrou ocupar mais da metade
+        num_slots = SLOTS_MINIMO
+        while len(vivos) + 1 > num_slots * CARGA_MAXIMA / 2:
+            num_slots *= 2
+        usado = sum(REGISTRO.size + len(chave) + len(valor) for chave, _, _, valor in vivos) + reserva
+        capacidade = DADOS_MINIMO
+        while usado > capacidade // 2:
+            capacidade *= 2
+
+        _criar(self.caminho, num_slots, capacidade, vivos)
+        self._mapear()
+        return len(vivos)
+
+    def estatisticas(self):
+        with self._lock:
+            self._verificar_troca(forcar=True)
+            _, _, num_slots, _, tamanho, fim, registros, mortos = self._cabecalho()
+        return {'registros': registros, 'slots': num_slots, 'tamanho_bytes': tamanho,
+                'dados_bytes': fim - TAMANHO_CABECALHO - num_slots * SLOT.size, 'mortos_bytes': mortos}
+
+    def fechar(self):
+        with self._lock:
+            if self._mapa is not None:
+                self._mapa.close()
+                self._mapa = None
+            self._trava.close()
+
+
+# --- interface usada por filter.filtrar_dados ---
+
+_cache = None
+
+
+def ativar(caminho, ttl_encontrado=7 * 86400, ttl_nao_encontrado=86400):
+    global _cache
+    if fcntl is None:
+        print("⚠ Cache compartilhado indisponível nesta plataforma", file=sys.stderr)
+        return None
+    _cache = CacheCompartilhado(caminho, ttl_encontrado, ttl_nao_encontrado)
+    return _cache
+
+
+def configurar_do_ambiente(caminho=None):
+    # RPA_CACHE_COMPARTILHADO=data/consultas.cache  RPA_CACHE_TTL / RPA_CACHE_TTL_NEGATIVO em segundos
+    caminho = caminho or os.environ.get('RPA_CACHE_COMPARTILHADO')
+    if caminho and _cache is None:
+        ativar(caminho, int(os.environ.get('RPA_CACHE_TTL', 7 * 86400)),
+               int(os.environ.get('RPA_CACHE_TTL_NEGATIVO', 86400)))
+
+
+def desativar():
+    global _cache
+    if _cache is not None:
+        _cache.fechar()
+    _cache = None
+
+
+def caminho_ativo():
+    return _cache.caminho if _cache is not None else None
+
+
+def _chave(pais):
+    return input.canonizar(pais).encode('utf-8')
+
+
+def consultar(pais):
+    """None se não há nada em cache; senão (pais_data, json original) ou False para "não encontrado" """
+    if _cache is None:
+        return None
+    encontrado = _cache.obter(_chave(pais))
+    if encontrado is None:
+        metrics.incrementar('cache_faltas')
+        return None
+    metrics.incrementar('cache_acertos')
+    tipo, valor = encontrado
+    if tipo == NAO_ENCONTRADO:
+        return False
+    pais_data, pais_info = json.loads(zlib.decompress(valor))
+    return pais_data, pais_info
+
+
+def registrar(pais, resultado):
+    # resultado: (pais_data, json original) ou None quando a API não encontrou o país
+    if _cache is None:
+        return
+    if resultado is None:
+        _cache.guardar(_chave(pais), NAO_ENCONTRADO)
+    else:
+        valor = zlib.compress(json.dumps(resultado, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+        _cache.guardar(_chave(pais), ENCONTRADO, valor)
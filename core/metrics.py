@@ -0,0 +1,240 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ativo = False
+_lock = threading.Lock()
+_histogramas = {}
+_contadores = {}
+_gauges = {}
+_inicio = None
+_saida_json = None
+_saida_prometheus = None
+_registrado = False
+
+
+class Histograma:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.minimo = None
+        self.maximo = None
+
+    def observar(self, valor):
+        posicao = len(BUCKETS)
+        for indice, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                posicao = indice
+                break
+        self.buckets[posicao] += 1
+        self.total += 1
+        self.soma += valor
+        if self.minimo is None or valor < self.minimo:
+            self.minimo = valor
+        if self.maximo is None or valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, p):
+        # Estimativa pelo limite superior do bucket que contém o percentil
+        if not self.total:
+            return 0.0
+        alvo = p / 100.0 * self.total
+        acumulado = 0
+        for indice, quantidade in enumerate(self.buckets):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return min(BUCKETS[indice], self.maximo) if indice < len(BUCKETS) else self.maximo
+        return self.maximo
+
+
+class _Medicao:
+    __slots__ = ('etapa', 'inicio')
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+
+    def __enter__(self):
+        ajustar_gauge(f"em_andamento_{self.etapa}", 1)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        duracao = time.perf_counter() - self.inicio
+        with _lock:
+            histograma = _histogramas.get(self.etapa)
+            if histograma is None:
+                histograma = _histogramas[self.etapa] = Histograma()
+            histograma.observar(duracao)
+        ajustar_gauge(f"em_andamento_{self.etapa}", -1)
+        if tipo is not None:
+            incrementar(f"erros_{self.etapa}")
+        return False
+
+
+class _MedicaoNula:
+    # Usada quando as métricas estão desligadas: não mede nada
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        return False
+
+
+_NULA = _MedicaoNula()
+
+
+def ativar(saida_json=None, saida_prometheus=None):
+    global _ativo, _inicio, _saida_json, _saida_prometheus, _registrado
+    _ativo = True
+    _inicio = time.time()
+    _saida_json = saida_json
+    _saida_prometheus = saida_prometheus
+    if (saida_json or saida_prometheus) and not _registrado:
+        atexit.register(exportar)
+        _registrado = True
+
+
+def ativo():
+    return _ativo
+
+
+def configurar_do_ambiente():
+    # RPA_METRICAS=resumo.json  RPA_METRICAS_PROMETHEUS=metricas.prom
+    saida_json = os.environ.get('RPA_METRICAS')
+    saida_prometheus = os.environ.get('RPA_METRICAS_PROMETHEUS')
+    if saida_json or saida_prometheus:
+        ativar(saida_json, saida_prometheus)
+
+
+def medir(etapa):
+    """Context manager que registra a latência da etapa no histograma correspondente"""
+    if not _ativo:
+        return _NULA
+    return _Medicao(etapa)
+
+
+def incrementar(contador, valor=1):
+    if not _ativo:
+        return
+    with _lock:
+        _contadores[contador] = _contadores.get(contador, 0) + valor
+
+
+def ajustar_gauge(gauge, delta):
+    if not _ativo:
+        return
+    with _lock:
+        _gauges[gauge] = _gauges.get(gauge, 0) + delta
+
+
+def definir_gauge(gauge, valor):
+    if not _ativo:
+        return
+    with _lock:
+        _gauges[gauge] = valor
+
+
+def resumo():
+    with _lock:
+        etapas = {}
+        for etapa, histograma in _histogramas.items():
+            etapas[etapa] = {
+                'total': histograma.total,
+                'soma_s': round(histograma.soma, 6),
+                'media_ms': round(histograma.soma / histograma.total * 1000, 4) if histograma.total else 0.0,
+                'min_ms': round((histograma.minimo or 0.0) * 1000, 4),
+                'max_ms': round((histograma.maximo or 0.0) * 1000, 4),
+                'p50_ms': round(histograma.percentil(50) * 1000, 4),
+                'p90_ms': round(histograma.percentil(90) * 1000, 4),
+                'p99_ms': round(histograma.percentil(99) * 1000, 4),
+            }
+        return {
+            'inicio': _inicio,
+            'duracao_s': round(time.time() - _inicio, 3) if _inicio else 0.0,
+            'etapas': etapas,
+            'contadores': dict(_contadores),
+            'gauges': dict(_gauges),
+        }
+
+
+def estado():
+    """Histogramas e contadores em forma serializável, para somar os de outro processo com incorporar()"""
+    with _lock:
+        return {
+            'histogramas': {etapa: {'buckets': h.buckets, 'total': h.total, 'soma': h.soma,
+                                    'minimo': h.minimo, 'maximo': h.maximo}
+                            for etapa, h in _histogramas.items()},
+            'contadores': dict(_contadores),
+        }
+
+
+def incorporar(outro):
+    # Soma o estado() de outro processo (ex.: um shard); gauges são instantâneos e ficam de fora
+    if not _ativo:
+        return
+    with _lock:
+        for etapa, dados in outro['histogramas'].items():
+            histograma = _histogramas.get(etapa)
+            if histograma is None:
+                histograma = _histogramas[etapa] = Histograma()
+            histograma.buckets = [a + b for a, b in zip(histograma.buckets, dados['buckets'])]
+            histograma.total += dados['total']
+            histograma.soma += dados['soma']
+            for campo, escolher in (('minimo', min), ('maximo', max)):
+                valores = [v for v in (getattr(histograma, campo), dados[campo]) if v is not None]
+                setattr(histograma, campo, escolher(valores) if valores else None)
+        for contador, valor in outro['contadores'].items():
+            _contadores[contador] = _contadores.get(contador, 0) + valor
+
+
+def exportar_json(caminho):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(resumo(), arquivo, indent=2, ensure_ascii=False)
+
+
+def exportar_prometheus(caminho):
+    # Formato texto do Prometheus (compatível com o textfile collector do node_exporter)
+    linhas = [
+        '# HELP rpa_etapa_duracao_segundos Latência por etapa do pipeline',
+        '# TYPE rpa_etapa_duracao_segundos histogram',
+    ]
+    with _lock:
+        for etapa, histograma in sorted(_histogramas.items()):
+            acumulado = 0
+            for indice, limite in enumerate(BUCKETS):
+                acumulado += histograma.buckets[indice]
+                linhas.append(f'rpa_etapa_duracao_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+            linhas.append(f'rpa_etapa_duracao_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {histograma.total}')
+            linhas.append(f'rpa_etapa_duracao_segundos_sum{{etapa="{etapa}"}} {histograma.soma}')
+            linhas.append(f'rpa_etapa_duracao_segundos_count{{etapa="{etapa}"}} {histograma.total}')
+
+        linhas.append('# HELP rpa_eventos_total Contadores de eventos do pipeline')
+        linhas.append('# TYPE rpa_eventos_total counter')
+        for contador, valor in sorted(_contadores.items()):
+            linhas.append(f'rpa_eventos_total{{evento="{contador}"}} {valor}')
+
+        linhas.append('# HELP rpa_gauge Valores instantâneos do pipeline')
+        linhas.append('# TYPE rpa_gauge gauge')
+        for gauge, valor in sorted(_gauges.items()):
+            linhas.append(f'rpa_gauge{{nome="{gauge}"}} {valor}')
+
+    # Troca atômica para o coletor nunca ler um arquivo pela metade
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('\n'.join(linhas) + '\n')
+    os.replace(temporario, caminho)
+
+
+def exportar():
+    if _saida_json:
+        exportar_json(_saida_json)
+    if _saida_prometheus:
+        exportar_prometheus(_saida_prometheus)
@@ -0,0 +1,191 @@
+import os
+import queue
+import threading
+
+from core import metrics
+
+# Marca o fim da entrada em cada fila
+_FIM = object()
+# Intervalo com que threads bloqueadas em uma fila conferem se o pipeline foi interrompido
+_ESPERA = 0.1
+
+
+class Etapa:
+    """Uma etapa do pipeline: `funcao` recebe um item e devolve o item da etapa seguinte.
+
+    `paralelismo` threads executam a função ao mesmo tempo; `capacidade` limita a fila de entrada
+    da etapa, então uma etapa lenta segura as anteriores em vez de acumular itens em memória.
+    Na última etapa, `ocioso` (sem argumentos) é chamada sempre que a fila de entrada esvazia,
+    antes de esperar o próximo item.
+    """
+
+    def __init__(self, nome, funcao, paralelismo=1, capacidade=None, ocioso=None):
+        if paralelismo < 1:
+            raise ValueError(f"Paralelismo da etapa '{nome}' deve ser maior que zero")
+        self.nome = nome
+        self.funcao = funcao
+        self.paralelismo = paralelismo
+        self.capacidade = capacidade
+        self.ocioso = ocioso
+
+
+class _Fila:
+    # Fila limitada que publica profundidade atual, pico e bloqueios por falta de espaço
+    def __init__(self, nome, capacidade):
+        self.nome = nome
+        self.fila = queue.Queue(maxsize=capacidade)
+        self.pico = 0
+        self._lock = threading.Lock()
+
+    def _publicar(self):
+        profundidade = self.fila.qsize()
+        metrics.definir_gauge(f"fila_{self.nome}", profundidade)
+        with self._lock:
+            if profundidade > self.pico:
+                self.pico = profundidade
+                metrics.definir_gauge(f"fila_{self.nome}_pico", profundidade)
+
+    def colocar(self, item, parar):
+        if self.fila.full():
+            # A etapa que consome esta fila é o gargalo neste momento
+            metrics.incrementar(f"fila_{self.nome}_cheia")
+        while not parar.is_set():
+            try:
+                self.fila.put(item, timeout=_ESPERA)
+            except queue.Full:
+                continue
+            if item is not _FIM:
+                self._publicar()
+            return True
+        return False
+
+    def retirar(self, parar):
+        while not parar.is_set():
+            try:
+                item = self.fila.get(timeout=_ESPERA)
+            except queue.Empty:
+                continue
+            if item is not _FIM:
+                self._publicar()
+            return item
+        return _FIM
+
+
+class Pipeline:
+    """Liga uma fonte de itens a uma sequência de etapas por filas limitadas.
+
+    A fonte e cada etapa intermediária rodam em suas próprias threads, então rede, CPU e disco
+    se sobrepõem. A última etapa roda na thread que chamou `executar`, onde fica a conexão SQLite,
+    e por isso tem sempre paralelismo 1. Os itens saem fora da ordem de entrada quando alguma
+    etapa tem mais de uma thread. Se uma etapa levantar exceção, as demais param de pegar itens,
+    as threads são aguardadas e a exceção é relançada em `executar`.
+    """
+
+    def __init__(self, etapas, capacidade=16):
+        self.etapas = list(etapas)
+        if not self.etapas:
+            raise ValueError('O pipeline precisa de pelo menos uma etapa')
+        if self.etapas[-1].paralelismo != 1:
+            raise ValueError(f"A última etapa ('{self.etapas[-1].nome}') roda na thread principal; use paralelismo 1")
+        self.capacidade = capacidade
+        self._lock = threading.Lock()
+
+    def _falhar(self, erro):
+        with self._lock:
+            if self._erro is None:
+                self._erro = erro
+        self._parar.set()
+
+    def _alimentar(self, fonte, saida):
+        try:
+            for item in fonte:
+                if not saida.colocar(item, self._parar):
+                    return
+        except BaseException as erro:
+            self._falhar(erro)
+        finally:
+            # Um gerador interrompido é fechado aqui, na thread em que abriu seus recursos
+            fechar = getattr(fonte, 'close', None)
+            if fechar is not None:
+                try:
+                    fechar()
+                except BaseException as erro:
+                    self._falhar(erro)
+            saida.colocar(_FIM, self._parar)
+
+    def _trabalhar(self, etapa, entrada, saida, restantes):
+        try:
+            while True:
+                item = entrada.retirar(self._parar)
+                if item is _FIM:
+                    # Devolve o marcador para as outras threads da mesma etapa
+                    entrada.colocar(_FIM, self._parar)
+                    return
+                if not saida.colocar(etapa.funcao(item), self._parar):
+                    return
+        except BaseException as erro:
+            self._falhar(erro)
+        finally:
+            # Só a última thread da etapa a terminar avisa a etapa seguinte
+            with self._lock:
+                restantes[0] -= 1
+                ultima = restantes[0] == 0
+            if ultima:
+                saida.colocar(_FIM, self._parar)
+
+    def executar(self, fonte):
+        """Processa todos os itens de `fonte`; devolve quantos chegaram ao fim da última etapa"""
+        self._parar = threading.Event()
+        self._erro = None
+        filas = [_Fila(etapa.nome, etapa.capacidade or self.capacidade) for etapa in self.etapas]
+        # A fonte pode ficar presa lendo a entrada (ex.: input()), então sua thread não impede a saída
+        threads = [threading.Thread(target=self._alimentar, args=(iter(fonte), filas[0]),
+                                    name='pipeline-entrada', daemon=True)]
+        for posicao, etapa in enumerate(self.etapas[:-1]):
+            restantes = [etapa.paralelismo]
+            for numero in range(etapa.paralelismo):
+                threads.append(threading.Thread(
+                    target=self._trabalhar, args=(etapa, filas[posicao], filas[posicao + 1], restantes),
+                    name=f"pipeline-{etapa.nome}-{numero}", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        ultima = self.etapas[-1]
+        total = 0
+        try:
+            while True:
+                if ultima.ocioso is not None and filas[-1].fila.empty():
+                    ultima.ocioso()
+                item = filas[-1].retirar(self._parar)
+                if item is _FIM:
+                    break
+                ultima.funcao(item)
+                total += 1
+        except BaseException as erro:
+            self._falhar(erro)
+        finally:
+            self._parar.set()
+            for thread in threads[1:]:
+                thread.join()
+            threads[0].join(_ESPERA)
+            for fila in filas:
+                metrics.definir_gauge(f"fila_{fila.nome}", 0)
+        if self._erro is not None:
+            raise self._erro
+        return total
+
+
+def paralelismo_do_ambiente(padrao):
+    """Aplica RPA_PARALELISMO=etapa=N,etapa=N sobre o paralelismo padrão de cada etapa"""
+    paralelismo = dict(padrao)
+    for par in os.environ.get('RPA_PARALELISMO', '').split(','):
+        if not par.strip():
+            continue
+        nome, _, valor = par.partition('=')
+        nome = nome.strip()
+        if nome not in paralelismo:
+            raise ValueError(f"Etapa desconhecida em RPA_PARALELISMO: '{nome}' (etapas: {', '.join(paralelismo)})")
+        if not valor.strip().isdigit() or int(valor) < 1:
+            raise ValueError(f"Paralelismo inválido em RPA_PARALELISMO: '{par.strip()}' (use etapa=N, N >= 1)")
+        paralelismo[nome] = int(valor)
+    return paralelismo
@@ -0,0 +1,219 @@
+import atexit
+import os
+import sys
+import threading
+
+_ativo = False
+_pasta = None
+_top = 20
+_amostragem = 10
+_lock = threading.Lock()
+_local = threading.local()
+_perfis = {}
+_alocacoes = {}
+_chamadas = {}
+_sem_cpu = {}
+_registrado = False
+_avisado = False
+# A partir do Python 3.12 o cProfile usa sys.monitoring e só um perfil pode estar ativo por
+# processo; as threads disputam esta vaga e quem não a consegue fica só com as alocações
+_EXCLUSIVO = sys.version_info >= (3, 12)
+_vaga = threading.Lock()
+
+
+class _Etapa:
+    __slots__ = ('nome', 'perfil', 'antes', 'externa', 'com_vaga')
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.perfil = None
+        self.antes = None
+        self.externa = False
+        self.com_vaga = False
+
+    def __enter__(self):
+        # Etapas aninhadas na mesma thread ficam contabilizadas na etapa externa
+        if getattr(_local, 'ativa', None) is not None:
+            return self
+        _local.ativa = self.nome
+        self.externa = True
+
+        with _lock:
+            chamada = _chamadas.get(self.nome, 0)
+            _chamadas[self.nome] = chamada + 1
+            # cProfile só pode ter um perfil ativo por thread, então há um por (etapa, thread)
+            chave = (self.nome, threading.get_ident())
+            self.perfil = _perfis.get(chave)
+            if self.perfil is None:
+                import cProfile
+                self.perfil = _perfis[chave] = cProfile.Profile()
+
+        # Snapshots custam caro; só uma a cada `_amostragem` chamadas da etapa é comparada
+        if chamada % _amostragem == 0:
+            self.antes = _snapshot()
+        self._ligar()
+        return self
+
+    def _ligar(self):
+        # Falhas do profiler nunca chegam à etapa medida: no pior caso, a chamada fica sem perfil de CPU
+        if _EXCLUSIVO:
+            self.com_vaga = _vaga.acquire(blocking=False)
+            if not self.com_vaga:
+                self._sem_perfil()
+                return
+        try:
+            self.perfil.enable()
+        except ValueError:
+            # Outra ferramenta (depurador, coverage) já ocupa o profiler do processo
+            self._soltar_vaga()
+            self._sem_perfil()
+
+    def _sem_perfil(self):
+        global _avisado
+        self.perfil = None
+        with _lock:
+            _sem_cpu[self.nome] = _sem_cpu.get(self.nome, 0) + 1
+            avisar = not _avisado
+            _avisado = True
+        if avisar:
+            print("⚠ Perfil de CPU: só um profiler pode ficar ativo por processo; chamadas simultâneas "
+                  "em outras threads ficam só com o perfil de alocações", file=sys.stderr)
+
+    def _soltar_vaga(self):
+        if self.com_vaga:
+            self.com_vaga = False
+            _vaga.release()
+
+    def __exit__(self, tipo, valor, traceback):
+        if not self.externa:
+            return False
+        if self.perfil is not None:
+            self.perfil.disable()
+            self._soltar_vaga()
+        _local.ativa = None
+
+        if self.antes is not None:
+            diferencas = _snapshot().compare_to(self.antes, 'lineno')
+            with _lock:
+                acumulado = _alocacoes.setdefault(self.nome, {})
+                for diferenca in diferencas:
+                    quadro = diferenca.traceback[0]
+                    if diferenca.size_diff <= 0 or _ignorar(quadro.filename):
+                        continue
+                    chave = str(quadro)
+                    tamanho, quantidade = acumulado.get(chave, (0, 0))
+                    acumulado[chave] = (tamanho + diferenca.size_diff, quantidade + diferenca.count_diff)
+        return False
+
+
+def _snapshot():
+    import tracemalloc
+    return tracemalloc.take_snapshot()
+
+
+def _ignorar(arquivo):
+    # Descarta o que o próprio tracemalloc e este módulo alocam ao tirar as snapshots
+    import tracemalloc
+    return arquivo in (tracemalloc.__file__, __file__)
+
+
+class _EtapaNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        return False
+
+
+_NULA = _EtapaNula()
+
+
+def ativar(pasta, top=20, amostragem=10):
+    """Liga o cProfile e o tracemalloc por etapa; os relatórios são gravados em `pasta` ao final"""
+    global _ativo, _pasta, _top, _amostragem, _registrado
+    import tracemalloc
+
+    if not os.path.exists(pasta):
+        os.makedirs(pasta)
+    _pasta = pasta
+    _top = top
+    _amostragem = max(1, amostragem)
+    _ativo = True
+    if not tracemalloc.is_tracing():
+        # Um quadro por alocação basta para agrupar por linha e mantém as snapshots baratas
+        tracemalloc.start(1)
+    if not _registrado:
+        atexit.register(gravar_relatorios)
+        _registrado = True
+
+
+def configurar_do_ambiente():
+    # RPA_PROFILE=pasta  RPA_PROFILE_AMOSTRAGEM=N (snapshot de memória a cada N chamadas)
+    pasta = os.environ.get('RPA_PROFILE')
+    if pasta:
+        ativar(pasta, amostragem=int(os.environ.get('RPA_PROFILE_AMOSTRAGEM', '10')))
+
+
+def configuracao():
+    """(pasta, amostragem) do perfil ativo, para repassar a outros processos; None se desligado"""
+    return (_pasta, _amostragem) if _ativo else None
+
+
+def etapa(nome):
+    """Context manager que acumula perfil de CPU e alocações da etapa"""
+    if not _ativo:
+        return _NULA
+    return _Etapa(nome)
+
+
+def gravar_relatorios():
+    if not _ativo:
+        return []
+    import pstats
+
+    with _lock:
+        por_etapa = {}
+        for (nome, _), perfil in _perfis.items():
+            por_etapa.setdefault(nome, []).append(perfil)
+        alocacoes = {nome: dict(itens) for nome, itens in _alocacoes.items()}
+        chamadas = dict(_chamadas)
+        sem_cpu = dict(_sem_cpu)
+
+    arquivos = []
+    for nome in sorted(set(por_etapa) | set(alocacoes)):
+        # Perfis de threads diferentes da mesma etapa são somados; perfis que nunca rodaram são ignorados
+        estatisticas = None
+        for perfil in por_etapa.get(nome, []):
+            try:
+                if estatisticas is None:
+                    estatisticas = pstats.Stats(perfil)
+                else:
+                    estatisticas.add(perfil)
+            except TypeError:
+                continue
+        if estatisticas is not None:
+            caminho_pstats = os.path.join(_pasta, f"{nome}.pstats")
+            estatisticas.dump_stats(caminho_pstats)
+            arquivos.append(caminho_pstats)
+
+        caminho_texto = os.path.join(_pasta, f"{nome}.txt")
+        with open(caminho_texto, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(f"Etapa: {nome} ({chamadas.get(nome, 0)} chamadas")
+            if sem_cpu.get(nome):
+                arquivo.write(f", {sem_cpu[nome]} sem perfil de CPU")
+            arquivo.write(")\n\n")
+            arquivo.write(f"== Top {_top} funções por tempo acumulado ==\n")
+            if estatisticas is not None:
+                estatisticas.stream = arquivo
+                estatisticas.sort_stats('cumulative').print_stats(_top)
+            else:
+                arquivo.write("(nenhuma chamada com perfil de CPU)\n\n")
+
+            arquivo.write(f"== Top {_top} alocações (amostra de 1 a cada {_amostragem} chamadas) ==\n")
+            maiores = sorted(alocacoes.get(nome, {}).items(), key=lambda item: item[1][0], reverse=True)[:_top]
+            for local, (tamanho, quantidade) in maiores:
+                arquivo.write(f"{tamanho / 1024:10.1f} KiB {quantidade:8d} blocos  {local}\n")
+        arquivos.append(caminho_texto)
+    return arquivos
@@ -0,0 +1,213 @@
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import zlib
+
+import models
+from api import cassette, deadline
+from core import ingest, journal, lookup_cache, metrics, profiling
+
+CONFLITOS = ('ignorar', 'substituir')
+
+def particionar(nome, num_shards):
+    # Hash estável entre processos (hash() do Python muda a cada execução)
+    return zlib.crc32(nome.encode('utf-8')) % num_shards
+
+def pasta_shards(caminho_db=None):
+    caminho_db = caminho_db or models.caminho
+    return os.path.join(os.path.dirname(caminho_db) or '.', 'shards')
+
+def _arquivo_metricas(caminho_shard):
+    return os.path.splitext(caminho_shard)[0] + '.metricas.json'
+
+def _trabalhador(indice, caminho_shard, fila, workers, tamanho_lote, max_tentativas, timeout, prazo,
+                 cache_compartilhado=None, perfil=None, medir=False):
+    # Processo filho: busca, filtra e grava em seu próprio banco de shard
+    cassette.configurar_do_ambiente()
+    deadline.configurar(timeout, prazo)
+    if cache_compartilhado:
+        # Todos os shards mapeiam o mesmo arquivo: o que um buscou os outros leem sem ir à API
+        lookup_cache.configurar_do_ambiente(cache_compartilhado)
+    if perfil:
+        # Cada shard grava seus perfis em <pasta>/shard_<n>/ ao terminar (atexit de profiling.ativar)
+        pasta, amostragem = perfil
+        profiling.ativar(os.path.join(pasta, f"shard_{indice}"), amostragem=amostragem)
+    if medir:
+        # Sem saída própria: o estado vai para um arquivo que o processo principal soma ao seu
+        metrics.ativar()
+    models.conectar(caminho_shard)
+    try:
+        _ingerir_shard(indice, fila, workers, tamanho_lote, max_tentativas)
+    finally:
+        models.fechar()
+        if medir:
+            with open(_arquivo_metricas(caminho_shard), 'w', encoding='utf-8') as arquivo:
+                json.dump(metrics.estado(), arquivo)
+
+def _ingerir_shard(indice, fila, workers, tamanho_lote, max_tentativas):
+    def entrada():
+        # Cada item é (nome canônico, grafias originais); a busca começa enquanto a fila ainda enche
+        while True:
+            item = fila.get()
+            if item is None:
+                return
+            yield item
+
+    progresso = ingest.Progresso(prefixo=f"[shard {indice}] ", interativo=False)
+    ingest.ingerir(None, workers, tamanho_lote, progresso, max_tentativas, entrada=entrada())
+
+def _entregar(fila, processo, item, espera=0.5):
+    # put com timeout: se o shard morreu sem esvaziar a fila, o processo principal não fica preso
+    while processo.is_alive():
+        try:
+            fila.put(item, timeout=espera)
+            return True
+        except queue.Full:
+            continue
+    # Dados ainda no buffer da fila nunca serão lidos; não espera por eles ao sair
+    fila.cancel_join_thread()
+    return False
+
+def ingerir_em_shards(nomes=None, num_shards=2, workers=1, tamanho_lote=50, max_tentativas=3, conflito='ignorar'):
+    """Distribui os nomes pendentes entre processos, cada um com seu banco de shard, e mescla o resultado"""
+    pasta = pasta_shards()
+    if not os.path.exists(pasta):
+        os.makedirs(pasta)
+
+    # Shards que sobraram de uma execução interrompida são mesclados antes de começar
+    mesclar(pasta, conflito)
+
+    # As grafias originais ficam no processo principal e seguem com cada nome para o seu shard
+    variantes = ingest.Variantes()
+    if nomes is not None:
+        journal.registrar(variantes.canonizar(ingest.medir_entrada(nomes)))
+
+    contexto = multiprocessing.get_context('spawn')
+    filas = [contexto.Queue(maxsize=1000) for _ in range(num_shards)]
+    processos = []
+    for indice, fila in enumerate(filas):
+        caminho_shard = os.path.join(pasta, f"shard_{indice}.db")
+        processo = contexto.Process(
+            target=_trabalhador,
+            # O prazo vai como o tempo que resta agora: o relógio monotônico não é compartilhado entre processos
+            args=(indice, caminho_shard, fila, workers, tamanho_lote, max_tentativas,
+                  deadline.timeout_requisicao, deadline.restante(), lookup_cache.caminho_ativo(),
+                  profiling.configuracao(), metrics.ativo()))
+        processo.start()
+        processos.append(processo)
+
+    mortos = set()
+    entregues = 0
+    nao_distribuidos = 0
+    try:
+        pendentes = ingest.medir_entrada(journal.pendentes(max_tentativas))
+        for nome in pendentes:
+            # Com o prazo esgotado, o que não foi distribuído continua pendente no jornal principal
+            if deadline.esgotado():
+                nao_distribuidos = 1 + sum(1 for _ in pendentes)
+                break
+            indice = particionar(nome, num_shards)
+            # Nomes de um shard que morreu também continuam pendentes, para a próxima execução
+            if indice in mortos or not _entregar(filas[indice], processos[indice], (nome, variantes.de(nome))):
+                mortos.add(indice)
+            else:
+                entregues += 1
+    finally:
+        for indice, fila in enumerate(filas):
+            if indice not in mortos:
+                _entregar(fila, processos[indice], None)
+        for processo in processos:
+            processo.join()
+        # Um shard parado pelo prazo deixa itens na fila; com ele encerrado, não há quem os leia
+        for fila in filas:
+            fila.cancel_join_thread()
+
+    falhos = [indice for indice, processo in enumerate(processos) if processo.exitcode != 0]
+    for indice in range(num_shards):
+        # Fetch, filter e insert dos shards entram nas métricas exportadas pelo processo principal
+        caminho_metricas = _arquivo_metricas(os.path.join(pasta, f"shard_{indice}.db"))
+        if os.path.exists(caminho_metricas):
+            with open(caminho_metricas, encoding='utf-8') as arquivo:
+                metrics.incorporar(json.load(arquivo))
+            os.remove(caminho_metricas)
+    resultado = mesclar(pasta, conflito)
+    # Adiados: o que não chegou a um shard e o que um shard recebeu mas não processou; as falhas
+    # desta execução que podem ser refeitas já estão em 'falhas'
+    resultado['adiados'] = nao_distribuidos + entregues - resultado['processados'] if deadline.esgotado() else 0
+    if falhos:
+        raise RuntimeError(f"Shards com erro: {', '.join(map(str, falhos))}")
+    return resultado
+
+def _colunas_paises(db, esquema='main'):
+    linhas = db.execute(f'PRAGMA {esquema}.table_info(paises)').fetchall()
+    return [linha[1] for linha in linhas if linha[1] != 'id']
+
+def mesclar(pasta, conflito='ignorar'):
+    """Copia países e jornal de cada shard para o banco principal e remove o shard mesclado"""
+    if conflito not in CONFLITOS:
+        raise ValueError(f"Tratamento de conflito inválido: {conflito}")
+
+    resultado = {'processados': 0, 'inseridos': 0, 'atualizados': 0, 'duplicados': 0, 'falhas': 0}
+    db = models.db
+    for caminho_shard in sorted(glob.glob(os.path.join(pasta, 'shard_*.db'))):
+        with metrics.medir('merge'):
+            _mesclar_shard(db, caminho_shard, conflito, resultado)
+        os.remove(caminho_shard)
+    return resultado
+
+def _mesclar_shard(db, caminho_shard, conflito, resultado):
+    db.execute('ATTACH DATABASE ? AS shard', (caminho_shard,))
+    try:
+        # Só as colunas que existem nos dois bancos são copiadas
+        colunas_shard = set(_colunas_paises(db, 'shard'))
+        colunas = [coluna for coluna in _colunas_paises(db) if coluna in colunas_shard]
+        lista = ', '.join(colunas)
+
+        total_shard = db.execute('SELECT COUNT(*) FROM shard.paises').fetchone()[0]
+
+        if conflito == 'substituir':
+            atribuicoes = ', '.join(colunas)
+            db.execute(f'''
+                UPDATE paises SET ({atribuicoes}) = (
+                    SELECT {lista} FROM shard.paises s WHERE s.nome_comum = paises.nome_comum)
+                WHERE nome_comum IN (SELECT nome_comum FROM shard.paises)''')
+            resultado['atualizados'] += db.execute('SELECT changes()').fetchone()[0]
+
+        db.execute(f'''
+            INSERT INTO paises ({lista})
+            SELECT {lista} FROM shard.paises s
+            WHERE NOT EXISTS (SELECT 1 FROM paises p WHERE p.nome_comum = s.nome_comum)
+            ORDER BY s.id''')
+        inseridos = db.execute('SELECT changes()').fetchone()[0]
+        resultado['inseridos'] += inseridos
+        if conflito == 'ignorar':
+            resultado['duplicados'] += total_shard - inseridos
+
+        # O JSON arquivado acompanha os países; no modo ignorar, o arquivo existente é mantido
+        verbo = 'INSERT OR REPLACE' if conflito == 'substituir' else 'INSERT OR IGNORE'
+        db.execute(f'{verbo} INTO paises_bruto SELECT * FROM shard.paises_bruto')
+
+        # O jornal principal recebe o status final de cada nome processado no shard
+        db.execute('''
+            INSERT OR IGNORE INTO jornal_ingestao (nome)
+            SELECT nome FROM shard.jornal_ingestao''')
+        db.execute('''
+            UPDATE jornal_ingestao SET (status, tentativas, retentavel, erro, atualizado_em) = (
+                SELECT s.status, jornal_ingestao.tentativas + s.tentativas, s.retentavel, s.erro, s.atualizado_em
+                FROM shard.jornal_ingestao s WHERE s.nome = jornal_ingestao.nome)
+            WHERE nome IN (SELECT nome FROM shard.jornal_ingestao WHERE tentativas > 0)''')
+        for status, quantidade in db.execute('''
+                SELECT status, COUNT(*) FROM shard.jornal_ingestao
+                WHERE tentativas > 0 GROUP BY status''').fetchall():
+            resultado['processados'] += quantidade
+            if status == journal.FALHOU:
+                resultado['falhas'] += quantidade
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.execute('DETACH DATABASE shard')
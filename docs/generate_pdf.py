@@ -10,16 +10,114 @@ Ano: 2025
 """
 
 import os
+import hashlib
+import itertools
+import json
+import sqlite3
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from datetime import datetime
 from PIL import Image as PILImage
 import sys
 
+# Parâmetros do pré-processamento das imagens embutidas no PDF
+IMAGE_TARGET_DPI = 200
+IMAGE_MAX_BOX = (14*cm, 8*cm)
+IMAGE_JPEG_QUALITY = 82
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+IMAGE_CACHE_VERSION = 1
+
+# Parâmetros do relatório gerado a partir do banco
+REPORT_VERSION = 1
+REPORT_FETCH_SIZE = 500
+REPORT_ROWS_PER_TABLE = 35
+REPORT_FLAG_BOX = (0.8*cm, 0.5*cm)
+REPORT_COLUMN_WIDTHS = [1.1*cm, 4.2*cm, 3.3*cm, 3.4*cm, 2.2*cm, 1.8*cm]
+REPORT_FONT_SIZE = 8
+
+def _format_number(value, decimals=0):
+    """Formatar número no padrão brasileiro (1.234.567,8)"""
+    if value is None:
+        return '-'
+    text = f"{value:,.{decimals}f}"
+    return text.replace(',', '_').replace('.', ',').replace('_', '.')
+
+def _fit_text(text, width, font_name='Helvetica', font_size=REPORT_FONT_SIZE):
+    """Cortar o texto para caber na largura da coluna, sem quebrar a linha da tabela"""
+    text = text or ''
+    limit = width - 6
+    if stringWidth(text, font_name, font_size) <= limit:
+        return text
+    while text and stringWidth(text + '...', font_name, font_size) > limit:
+        text = text[:-1]
+    return text + '...'
+
+def _preprocess_image(source_path, target_path, max_pixels, jpeg_quality):
+    """Reduzir e recomprimir uma imagem; executado nos processos do pool"""
+    with PILImage.open(source_path) as pil_image:
+        original_size = pil_image.size
+        # thumbnail só reduz: imagens menores que o alvo mantêm a resolução original
+        pil_image.thumbnail(max_pixels, PILImage.LANCZOS)
+        temporary_path = target_path + '.tmp'
+        if target_path.endswith('.png'):
+            pil_image.save(temporary_path, 'PNG', optimize=True)
+        else:
+            if pil_image.mode != 'RGB':
+                pil_image = pil_image.convert('RGB')
+            pil_image.save(temporary_path, 'JPEG', quality=jpeg_quality, optimize=True, progressive=True)
+        final_size = pil_image.size
+    os.replace(temporary_path, target_path)
+    return original_size, final_size
+
+class _LazyStory:
+    """Lista de flowables preenchida sob demanda a partir de um gerador, para o build() do ReportLab.
+
+    O build consome a história pela frente (flowables[0], del flowables[0], inserções no início)
+    e só olha alguns itens adiante (keepWithNext), então basta manter uma pequena janela em
+    memória: as tabelas de cada região só são criadas quando o layout chega até elas.
+    """
+
+    def __init__(self, source, lookahead=8):
+        self._source = iter(source)
+        self._buffer = []
+        self._lookahead = lookahead
+
+    def _fill(self, size):
+        while self._source is not None and len(self._buffer) < size:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        # Tamanho da janela carregada; zero só quando o gerador terminou
+        self._fill(self._lookahead)
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, int) and index >= 0:
+            self._fill(index + 1)
+        else:
+            self._fill(self._lookahead)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        del self._buffer[index]
+
+    def insert(self, index, value):
+        self._buffer.insert(index, value)
+
+
 class TechnicalDocumentationGenerator:
     """Gerador de documentação técnica profissional para sistemas RPA"""
     
@@ -39,6 +137,12 @@ class TechnicalDocumentationGenerator:
         self.base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.images_path = os.path.join(self.base_path, "images")
         self.output_file = os.path.join(os.path.dirname(__file__), "Documentacao_Tecnica_RPA_Paises.pdf")
+        self.cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "images")
+        self.image_target_dpi = IMAGE_TARGET_DPI
+        self.db_path = os.path.join(self.base_path, "data", "paises.db")
+        self.flags_path = os.path.join(self.base_path, "data", "bandeiras")
+        self.report_file = os.path.join(os.path.dirname(__file__), "Relatorio_Paises.pdf")
+        self.image_assets = {}
         
         # Configurar estilos tipográficos
         self.styles = getSampleStyleSheet()
@@ -184,11 +288,95 @@ class TechnicalDocumentationGenerator:
                 leading=13
             ))
 
+    def _preprocess_images(self, source_paths=None, max_box=IMAGE_MAX_BOX, cache_path=None):
+        """Reduzir as imagens à resolução alvo em paralelo, com cache por hash do conteúdo"""
+        cache_path = cache_path or self.cache_path
+        if source_paths is None:
+            source_paths = [os.path.join(self.images_path, name) for name in sorted(os.listdir(self.images_path))]
+        os.makedirs(cache_path, exist_ok=True)
+        index_file = os.path.join(cache_path, "index.json")
+        try:
+            with open(index_file, encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            index = {}
+        
+        # Caixa máxima de exibição convertida de pontos para pixels na resolução alvo
+        max_pixels = tuple(int(side / 72 * self.image_target_dpi) for side in max_box)
+        used_keys = set()
+        pending = []
+        # Arquivos com o mesmo conteúdo compartilham uma única versão processada
+        sources_by_key = {}
+        
+        for source_path in source_paths:
+            extension = os.path.splitext(source_path)[1].lower()
+            if extension not in IMAGE_EXTENSIONS:
+                continue
+            with open(source_path, 'rb') as file:
+                digest = hashlib.sha256(file.read()).hexdigest()
+            # A chave inclui os parâmetros: mudar DPI ou qualidade invalida o cache
+            key = f"{digest}-{max_pixels[0]}x{max_pixels[1]}-{IMAGE_JPEG_QUALITY}-v{IMAGE_CACHE_VERSION}"
+            used_keys.add(key)
+            
+            entry = index.get(key)
+            if entry and os.path.exists(os.path.join(cache_path, entry['file'])):
+                self.image_assets[source_path] = dict(entry, path=os.path.join(cache_path, entry['file']))
+            elif key in sources_by_key:
+                sources_by_key[key].append(source_path)
+            else:
+                sources_by_key[key] = [source_path]
+                target_extension = '.png' if extension == '.png' else '.jpg'
+                pending.append((source_path, key, os.path.join(cache_path, key + target_extension)))
+        
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as pool:
+                futures = [
+                    (source_path, key, target_path,
+                     pool.submit(_preprocess_image, source_path, target_path, max_pixels, IMAGE_JPEG_QUALITY))
+                    for source_path, key, target_path in pending
+                ]
+                for source_path, key, target_path, future in futures:
+                    try:
+                        original_size, final_size = future.result()
+                    except Exception as error:
+                        # Sem versão processada, a imagem original é usada
+                        print(f"Erro no pré-processamento da imagem {source_path}: {error}")
+                        continue
+                    entry = {'file': os.path.basename(target_path), 'original_size': original_size, 'size': final_size}
+                    index[key] = entry
+                    for same_content_path in sources_by_key[key]:
+                        self.image_assets[same_content_path] = dict(entry, path=target_path)
+        
+        # Remover do cache as versões de imagens que mudaram ou deixaram de existir
+        for key in [key for key in index if key not in used_keys]:
+            stale_file = os.path.join(cache_path, index.pop(key)['file'])
+            if os.path.exists(stale_file):
+                os.remove(stale_file)
+        
+        temporary_index = index_file + '.tmp'
+        with open(temporary_index, 'w', encoding='utf-8') as file:
+            json.dump(index, file, indent=2)
+        os.replace(temporary_index, index_file)
+        
+        print(f"Imagens pré-processadas: {len(pending)} novas, {len(used_keys) - len(pending)} em cache")
+
+    def _image_asset(self, image_path):
+        """Caminho da versão pré-processada da imagem (ou da original, se não houver)"""
+        entry = self.image_assets.get(image_path)
+        if entry is None:
+            return image_path
+        return entry['path']
+
     def _optimize_image_dimensions(self, image_path, max_width=15*cm, max_height=10*cm):
         """Otimizar dimensões da imagem mantendo proporção"""
         try:
-            with PILImage.open(image_path) as pil_image:
-                original_width, original_height = pil_image.size
+            entry = self.image_assets.get(image_path)
+            if entry is not None:
+                # Dimensões guardadas no cache: a imagem não precisa ser aberta de novo
+                original_width, original_height = entry['original_size']
+            else:
+                with PILImage.open(image_path) as pil_image:
+                    original_width, original_height = pil_image.size
                 
             aspect_ratio = original_width / original_height
             
@@ -330,7 +518,7 @@ class TechnicalDocumentationGenerator:
         if os.path.exists(structure_image_path):
             try:
                 width, height = self._optimize_image_dimensions(structure_image_path, max_width=14*cm, max_height=8*cm)
-                structure_img = Image(structure_image_path, width=width, height=height)
+                structure_img = Image(self._image_asset(structure_image_path), width=width, height=height)
                 story.append(Spacer(1, 0.2*inch))
                 story.append(structure_img)
                 story.append(Spacer(1, 0.3*inch))
@@ -648,7 +836,7 @@ class TechnicalDocumentationGenerator:
                 if os.path.exists(image_path):
                     try:
                         width, height = self._optimize_image_dimensions(image_path, max_width=14*cm, max_height=8*cm)
-                        img = Image(image_path, width=width, height=height)
+                        img = Image(self._image_asset(image_path), width=width, height=height)
                         story.append(Spacer(1, 0.2*inch))
                         story.append(img)
                         story.append(Spacer(1, 0.25*inch))
@@ -886,6 +1074,198 @@ Pillow==10.0.0"""
         """
         story.append(Paragraph(authors_info, self.styles['BodyText']))
 
+    def _report_columns(self, db):
+        """Expressões das colunas do relatório; bancos sem cca2/cca3 simplesmente ficam sem bandeiras"""
+        existing = {row[1] for row in db.execute('PRAGMA table_info(paises)')}
+        columns = ['nome_comum', 'capital', 'subregiao', 'populacao', 'area', 'cca2', 'cca3']
+        return ', '.join(column if column in existing else f"'' AS {column}" for column in columns)
+
+    def _local_flags(self):
+        """Bandeiras locais em data/bandeiras, nomeadas pelo código do país (ex.: bra.png ou br.png)"""
+        if not os.path.isdir(self.flags_path):
+            return {}
+        flags = {}
+        for name in sorted(os.listdir(self.flags_path)):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() in IMAGE_EXTENSIONS:
+                flags[stem.lower()] = os.path.join(self.flags_path, name)
+        return flags
+
+    def _stream_rows(self, db, sql, parameters=()):
+        """Gerar as linhas em blocos de fetchmany, sem carregar a tabela inteira"""
+        cursor = db.execute(sql, parameters)
+        while True:
+            rows = cursor.fetchmany(REPORT_FETCH_SIZE)
+            if not rows:
+                return
+            yield rows
+
+    def _report_fingerprint(self, db, columns, flags):
+        """Impressão digital das entradas do relatório: linhas do banco e arquivos de bandeira"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"relatorio-v{REPORT_VERSION}-{self.image_target_dpi}".encode())
+        for rows in self._stream_rows(db, f"SELECT regiao, {columns} FROM paises ORDER BY id"):
+            digest.update(repr(rows).encode('utf-8'))
+        for code, path in sorted(flags.items()):
+            status = os.stat(path)
+            digest.update(f"{code}:{status.st_size}:{status.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def _flag_thumbnail(self, flags, cca2, cca3):
+        """Miniatura da bandeira já pré-processada, ou texto vazio se não houver arquivo local"""
+        path = flags.get((cca3 or '').lower()) or flags.get((cca2 or '').lower())
+        entry = self.image_assets.get(path) if path else None
+        if entry is None:
+            return ''
+        width, height = entry['size']
+        scale = min(REPORT_FLAG_BOX[0] / width, REPORT_FLAG_BOX[1] / height)
+        return Image(entry['path'], width=width * scale, height=height * scale)
+
+    def _create_report_header(self, story, total):
+        """Criar capa do relatório de países"""
+        story.append(Spacer(1, 1*inch))
+        story.append(Paragraph("Relatório de Países", self.styles['DocumentTitle']))
+        story.append(Paragraph("Dados coletados da REST Countries API", self.styles['DocumentSubtitle']))
+        story.append(Paragraph(
+            f"Gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')} a partir de "
+            f"{os.path.basename(self.db_path)}, com {_format_number(total)} países cadastrados.",
+            self.styles['BodyText']))
+
+    def _create_report_summary(self, story, regions):
+        """Criar tabela-resumo por região"""
+        story.append(Paragraph("Resumo por Região", self.styles['ChapterHeading']))
+        summary_data = [["Região", "Países", "População", "Área (km²)"]]
+        for region, count, population, area in regions:
+            summary_data.append([region or 'Sem região', _format_number(count),
+                                 _format_number(population), _format_number(area)])
+        summary_data.append(["Total", _format_number(sum(region[1] for region in regions)),
+                             _format_number(sum(region[2] or 0 for region in regions)),
+                             _format_number(sum(region[3] or 0 for region in regions))])
+        
+        summary_table = Table(summary_data, colWidths=[5*cm, 2.5*cm, 4*cm, 4*cm], repeatRows=1)
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f7fafc')]),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6)
+        ]))
+        story.append(summary_table)
+
+    def _create_report_table(self, rows, flags):
+        """Criar uma tabela de países; cada bloco de linhas vira uma tabela própria"""
+        table_data = [["", "País", "Capital", "Sub-região", "População", "Área (km²)"]]
+        for name, capital, subregion, population, area, cca2, cca3 in rows:
+            table_data.append([
+                self._flag_thumbnail(flags, cca2, cca3),
+                _fit_text(name, REPORT_COLUMN_WIDTHS[1]),
+                _fit_text(capital, REPORT_COLUMN_WIDTHS[2]),
+                _fit_text(subregion, REPORT_COLUMN_WIDTHS[3]),
+                _format_number(population),
+                _format_number(area)
+            ])
+        
+        country_table = Table(table_data, colWidths=REPORT_COLUMN_WIDTHS, repeatRows=1)
+        country_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2d3748')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), REPORT_FONT_SIZE),
+            ('ALIGN', (4, 0), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3)
+        ]))
+        return country_table
+
+    def _create_region_sections(self, db, columns, regions, flags):
+        """Gerar uma seção por região, com as linhas lidas do banco em blocos durante o build"""
+        for region, count, population, area in regions:
+            yield PageBreak()
+            yield Paragraph(region or 'Sem região', self.styles['ChapterHeading'])
+            yield Paragraph(
+                f"{_format_number(count)} países, população total de {_format_number(population)} "
+                f"habitantes e área de {_format_number(area)} km².", self.styles['BodyText'])
+            
+            # Tabelas pequenas de tamanho fixo: dividir uma tabela enorme entre páginas é caro no ReportLab
+            sql = f"SELECT {columns} FROM paises WHERE regiao IS ? ORDER BY nome_comum"
+            for rows in self._stream_rows(db, sql, (region,)):
+                for start in range(0, len(rows), REPORT_ROWS_PER_TABLE):
+                    yield self._create_report_table(rows[start:start + REPORT_ROWS_PER_TABLE], flags)
+                    yield Spacer(1, 0.3*cm)
+
+    def generate_report(self, force=False):
+        """Gerar o relatório de países a partir do banco; não refaz o PDF se as entradas não mudaram"""
+        fingerprint_file = self.report_file + ".fingerprint"
+        try:
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError(f"Banco de dados não encontrado: {self.db_path}")
+            
+            # Somente leitura: o relatório nunca altera o banco
+            db = sqlite3.connect(pathlib.Path(self.db_path).resolve().as_uri() + '?mode=ro', uri=True)
+            try:
+                columns = self._report_columns(db)
+                flags = self._local_flags()
+                fingerprint = self._report_fingerprint(db, columns, flags)
+                
+                previous = None
+                if os.path.exists(fingerprint_file) and os.path.exists(self.report_file):
+                    with open(fingerprint_file, encoding='utf-8') as file:
+                        previous = file.read().strip()
+                if previous == fingerprint and not force:
+                    print(f"Relatório já está atualizado (banco e bandeiras sem mudanças): {self.report_file}")
+                    return True
+                
+                if flags:
+                    print("Pré-processando bandeiras...")
+                    self._preprocess_images(list(flags.values()), max_box=REPORT_FLAG_BOX,
+                                            cache_path=os.path.join(os.path.dirname(self.cache_path), "flags"))
+                
+                regions = db.execute('''
+                    SELECT regiao, COUNT(*), SUM(populacao), SUM(area) FROM paises
+                    GROUP BY regiao ORDER BY regiao''').fetchall()
+                
+                report_content = []
+                self._create_report_header(report_content, sum(region[1] for region in regions))
+                self._create_report_summary(report_content, regions)
+                
+                # As seções entram no build sob demanda: o banco continua aberto até o fim do layout
+                print("Compilando relatório PDF...")
+                report_document = SimpleDocTemplate(
+                    self.report_file,
+                    pagesize=A4,
+                    rightMargin=2.5*cm,
+                    leftMargin=2.5*cm,
+                    topMargin=2*cm,
+                    bottomMargin=2*cm,
+                    title="Relatório de Países",
+                    author=self.authors
+                )
+                report_document.build(_LazyStory(itertools.chain(
+                    report_content, self._create_region_sections(db, columns, regions, flags))))
+            finally:
+                db.close()
+            
+            # A impressão digital só é gravada depois que o PDF foi gerado com sucesso
+            with open(fingerprint_file + '.tmp', 'w', encoding='utf-8') as file:
+                file.write(fingerprint)
+            os.replace(fingerprint_file + '.tmp', fingerprint_file)
+            
+            print(f"Relatório gerado com sucesso: {self.report_file}")
+            return True
+            
+        except Exception as error:
+            print(f"Erro na geração do relatório: {error}")
+            return False
+
     def generate_documentation(self):
         """Método principal para geração da documentação"""
         try:
@@ -893,6 +1273,10 @@ Pillow==10.0.0"""
             if not os.path.exists(self.images_path):
                 raise FileNotFoundError(f"Diretório de imagens não encontrado: {self.images_path}")
             
+            # Reduzir e recomprimir as imagens antes de montar o documento
+            print("Pré-processando imagens...")
+            self._preprocess_images()
+            
             # Configurar documento PDF
             pdf_document = SimpleDocTemplate(
                 self.output_file,
@@ -937,12 +1321,32 @@ Pillow==10.0.0"""
 
 def main():
     """Função principal de execução"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Gerador da documentação técnica e do relatório de países")
+    parser.add_argument("--relatorio", action="store_true", help="gera o relatório de países a partir do banco")
+    parser.add_argument("--db", help="banco SQLite do relatório (padrão: data/paises.db)")
+    parser.add_argument("--saida", help="arquivo PDF de saída")
+    parser.add_argument("--forcar", action="store_true", help="gera o relatório mesmo sem mudanças nas entradas")
+    args = parser.parse_args()
+    
     print("Sistema de Geração de Documentação Técnica")
     print("Projeto: RPA - Consulta Automatizada de Países")
     print("=" * 60)
     
     try:
         documentation_generator = TechnicalDocumentationGenerator()
+        if args.relatorio:
+            if args.db:
+                # As bandeiras locais ficam ao lado do banco (data/bandeiras)
+                documentation_generator.db_path = args.db
+                documentation_generator.flags_path = os.path.join(os.path.dirname(os.path.abspath(args.db)), "bandeiras")
+            if args.saida:
+                documentation_generator.report_file = args.saida
+            return 0 if documentation_generator.generate_report(force=args.forcar) else 1
+        
+        if args.saida:
+            documentation_generator.output_file = args.saida
         success = documentation_generator.generate_documentation()
         
         if success:
@@ -1,15 +1,235 @@
-from models import paises
-from core import input, insert, filter
-
-def main():
-    paises_lista = input.obter_paises()
-    
-    for pais in paises_lista:
-        pais_data = filter.filtrar_dados(pais)
-        if pais_data:
-            insert.insert_pais(pais_data, pais)
-    
-    insert.fechar_conexao()
+import argparse
+import os
+import sys
+
+import models
+from core import input, insert, filter, lookup_cache, metrics, pipeline, profiling
+from api import cassette, deadline
+
+# Códigos de saída do modo linha de comando
+SAIDA_OK = 0
+SAIDA_FALHAS = 1
+SAIDA_USO = 2
+SAIDA_ERRO = 3
+SAIDA_ADIADOS = 4
+SAIDA_INTERROMPIDO = 130
+
+# Threads por etapa do fluxo interativo; RPA_PARALELISMO=fetch=8,extracao=2 sobrescreve
+PARALELISMO_PADRAO = {'fetch': 4, 'extracao': 1}
+
+def _entrada(nomes, lidos):
+    nomes = iter(nomes)
+    while True:
+        with metrics.medir('input'), profiling.etapa('input'):
+            pais = next(nomes, None)
+        if pais is None:
+            return
+        lidos.append(pais)
+        yield pais
+
+def _extrair(item):
+    # Como ingest.etapa_extracao, mas avisando na hora os países não encontrados
+    pais, buscado, erro = item
+    if erro is not None:
+        return item
+    return pais, filter.extrair(pais, buscado, com_bruto=True), None
+
+def _gravar(gravados):
+    def gravar(item):
+        pais, resultado, erro = item
+        gravados.append(pais)
+        if erro is not None:
+            print(f"✗ Erro ao buscar '{pais}': {erro}")
+        elif resultado:
+            pais_data, bruto = resultado
+            insert.insert_pais(pais_data, pais, bruto=bruto)
+    return gravar
+
+def main(paises=None):
+    # paises: nomes a buscar no lugar dos três digitados (usado pelos benchmarks)
+    from core import ingest
+
+    cassette.configurar_do_ambiente()
+    metrics.configurar_do_ambiente()
+    profiling.configurar_do_ambiente()
+    deadline.configurar_do_ambiente()
+    lookup_cache.configurar_do_ambiente()
+
+    # Entrada, busca, extração e gravação em etapas ligadas por filas limitadas: a busca de um
+    # país começa enquanto o próximo é digitado e a gravação não espera a rede
+    paralelismo = pipeline.paralelismo_do_ambiente(PARALELISMO_PADRAO)
+    lidos, gravados = [], []
+    fluxo = pipeline.Pipeline([
+        pipeline.Etapa('fetch', ingest.etapa_busca, paralelismo['fetch']),
+        pipeline.Etapa('extracao', _extrair, paralelismo['extracao']),
+        pipeline.Etapa('insert', _gravar(gravados)),
+    ])
+    try:
+        fluxo.executar(_entrada(input.gerar_paises() if paises is None else paises, lidos))
+    except deadline.PrazoEsgotado:
+        restantes = [pais for pais in lidos if pais not in gravados]
+        print(f"⏸ Prazo esgotado: {len(restantes)} países adiados ({', '.join(restantes)})")
+    finally:
+        insert.fechar_conexao()
+        cassette.salvar()
+
+def criar_parser():
+    # Opções comuns a todos os subcomandos
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument('--db', default=models.CAMINHO_PADRAO, help='caminho do banco SQLite (padrão: %(default)s)')
+    comum.add_argument('--workers', type=int, default=4, help='requisições simultâneas à API (padrão: %(default)s)')
+    comum.add_argument('--batch-size', type=int, default=50, help='inserções por commit (padrão: %(default)s)')
+    comum.add_argument('--timeout', type=float, help=f'segundos por requisição à API (padrão: {deadline.TIMEOUT_PADRAO:g})')
+    comum.add_argument('--prazo', type=float, metavar='SEGUNDOS',
+                       help='tempo máximo da execução; o que faltar fica adiado (pendente no jornal)')
+    comum.add_argument('--profile', metavar='PASTA', help='grava perfis de CPU (pstats) e alocações por etapa em PASTA')
+    comum.add_argument('--cache-compartilhado', nargs='?', const='', metavar='CAMINHO',
+                       help='cache de consultas em arquivo mapeado em memória, compartilhado entre processos '
+                            '(padrão: consultas.cache ao lado do banco)')
+    comum.add_argument('--cache', help='cassete usado como cache de respostas da API (.json.gz)')
+
+    parser = argparse.ArgumentParser(
+        description='RPA - Consulta de Países. Sem subcomando, executa o fluxo interativo.')
+    subcomandos = parser.add_subparsers(dest='comando')
+
+    ingest = subcomandos.add_parser('ingest', parents=[comum], help='busca e insere países a partir de um arquivo')
+    ingest.add_argument('--input', help="arquivo com um país por linha ('-' para stdin, padrão sem --resume)")
+    ingest.add_argument('--resume', action='store_true', help='apenas retoma os nomes pendentes do jornal')
+    ingest.add_argument('--shards', type=int, default=1, help='processos de ingestão, cada um com seu banco de shard (padrão: %(default)s)')
+    ingest.add_argument('--conflito', choices=['ignorar', 'substituir'], default='ignorar',
+                        help='o que fazer na mescla quando o país já existe no banco (padrão: %(default)s)')
+    ingest.add_argument('--max-tentativas', type=int, default=3, help='tentativas por nome antes de desistir (padrão: %(default)s)')
+
+    subcomandos.add_parser('migrate', parents=[comum], help='aplica as migrações pendentes do banco')
+
+    reproject = subcomandos.add_parser('reproject', parents=[comum],
+                                       help='recalcula colunas a partir do JSON arquivado, sem acessar a API')
+    reproject.add_argument('--campos', help='campos extras separados por vírgula, ex.: latitude,longitude,gini '
+                                            '(padrão: recalcula as colunas básicas; lista em core/archive.py)')
+
+    refresh = subcomandos.add_parser('refresh', parents=[comum], help='atualiza os países já cadastrados')
+    refresh.add_argument('--lote-codigos', type=int, default=50,
+                         help='países por requisição /alpha?codes= (padrão: %(default)s)')
+
+    export = subcomandos.add_parser('export', parents=[comum], help='exporta a tabela paises')
+    export.add_argument('--formato', choices=['csv', 'jsonl'], default='csv')
+    export.add_argument('--saida', default='-', help="arquivo de saída ('-' para stdout; '.gz' compacta)")
+    export.add_argument('--gzip', action='store_true', help='compacta a saída com gzip')
+    export.add_argument('--colunas', help='colunas separadas por vírgula (padrão: todas)')
+    export.add_argument('--filtro', action='append', default=[],
+                        help="condição coluna<op>valor com op em = != > >= < <= ~ (LIKE); pode repetir")
+
+    serve = subcomandos.add_parser('serve', help='serviço HTTP local de consulta (somente leitura)')
+    serve.add_argument('--db', default=models.CAMINHO_PADRAO, help='caminho do banco SQLite (padrão: %(default)s)')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--porta', type=int, default=8080)
+
+    return parser
+
+def cli(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+
+    if args.comando is None:
+        main()
+        return SAIDA_OK
+
+    if args.comando == 'serve':
+        from api import server
+        from core import geo
+        try:
+            server.executar(args.db, args.host, args.porta, geo.IndiceGeografico.do_banco)
+        except FileNotFoundError as erro:
+            print(f"✗ {erro}", file=sys.stderr)
+            return SAIDA_ERRO
+        return SAIDA_OK
+
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error('--workers e --batch-size devem ser maiores que zero')
+    # Cada shard gravaria o próprio cassete por cima dos outros; só a reprodução é compartilhável
+    if args.comando == 'ingest' and args.shards > 1 and (
+            args.cache or cassette.modo_do_ambiente() in ('gravar', 'cache')):
+        parser.error('--cache e RPA_CASSETTE_MODO=gravar|cache não podem ser usados com --shards; '
+                     'use RPA_CASSETTE_MODO=reproduzir')
+    if (args.timeout is not None and args.timeout <= 0) or (args.prazo is not None and args.prazo <= 0):
+        parser.error('--timeout e --prazo devem ser maiores que zero')
+    if args.comando == 'refresh' and args.lote_codigos < 1:
+        parser.error('--lote-codigos deve ser maior que zero')
+    if args.comando == 'ingest' and args.input is None and not args.resume:
+        args.input = '-'
+    if args.comando == 'ingest' and args.input not in (None, '-') and not os.path.exists(args.input):
+        print(f"✗ Arquivo de entrada não encontrado: {args.input}", file=sys.stderr)
+        return SAIDA_ERRO
+
+    cassette.configurar_do_ambiente()
+    metrics.configurar_do_ambiente()
+    profiling.configurar_do_ambiente()
+    if args.profile:
+        profiling.ativar(args.profile)
+    # O prazo começa a contar aqui; as opções da linha de comando têm precedência sobre o ambiente
+    deadline.configurar_do_ambiente()
+    if args.timeout is not None or args.prazo is not None:
+        deadline.configurar(args.timeout if args.timeout is not None else deadline.timeout_requisicao,
+                            args.prazo if args.prazo is not None else deadline.restante())
+    if args.cache:
+        cassette.cache(args.cache)
+    if args.cache_compartilhado is not None:
+        lookup_cache.configurar_do_ambiente(
+            args.cache_compartilhado or os.path.join(os.path.dirname(args.db) or '.', 'consultas.cache'))
+    else:
+        lookup_cache.configurar_do_ambiente()
+
+    try:
+        if args.comando == 'migrate':
+            from models import migrations
+            models.conectar(args.db, migrar=False)
+            aplicadas = migrations.migrar(models.db)
+            print(f"✓ Banco na versão {migrations.versao(models.db)} "
+                  f"({len(aplicadas)} migrações aplicadas)", file=sys.stderr)
+            return SAIDA_OK
+
+        models.conectar(args.db)
+        if args.comando == 'ingest':
+            from core import ingest, shard
+            nomes = input.ler_arquivo(args.input) if args.input else None
+            if args.shards > 1:
+                resultado = shard.ingerir_em_shards(nomes, args.shards, args.workers, args.batch_size,
+                                                    args.max_tentativas, args.conflito)
+                print(f"✓ Shards mesclados: {resultado['inseridos']} inseridos, "
+                      f"{resultado['atualizados']} atualizados, {resultado['duplicados']} duplicados, "
+                      f"{resultado['falhas']} falhas, {resultado['adiados']} adiados", file=sys.stderr)
+            else:
+                resultado = ingest.ingerir(nomes, args.workers, args.batch_size, max_tentativas=args.max_tentativas)
+        elif args.comando == 'reproject':
+            from core import archive
+            campos = [campo.strip() for campo in args.campos.split(',') if campo.strip()] if args.campos else None
+            total = archive.reprojetar(campos, args.batch_size)
+            print(f"✓ {total} países reprojetados a partir do arquivo", file=sys.stderr)
+            return SAIDA_OK
+        elif args.comando == 'refresh':
+            from core import ingest
+            resultado = ingest.atualizar(args.workers, args.batch_size, lote_codigos=args.lote_codigos)
+        else:
+            from core import export
+            colunas = [coluna.strip() for coluna in args.colunas.split(',') if coluna.strip()] if args.colunas else None
+            filtros = [export.interpretar_filtro(filtro) for filtro in args.filtro]
+            total = export.exportar(args.formato, args.saida, colunas, filtros,
+                                    compactar=True if args.gzip else None, tamanho_lote=args.batch_size)
+            print(f"✓ {total} países exportados", file=sys.stderr)
+            return SAIDA_OK
+    except KeyboardInterrupt:
+        print("\n✗ Execução interrompida", file=sys.stderr)
+        return SAIDA_INTERROMPIDO
+    except Exception as erro:
+        print(f"✗ Erro: {erro}", file=sys.stderr)
+        return SAIDA_ERRO
+    finally:
+        insert.fechar_conexao()
+        cassette.salvar()
+
+    if resultado.get('adiados'):
+        return SAIDA_ADIADOS
+    return SAIDA_FALHAS if resultado['falhas'] else SAIDA_OK
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(cli())
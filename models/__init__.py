@@ -1,9 +1,41 @@
-import sqlite3
 import os
 
-# Garante que o diretório data existe
-if not os.path.exists('data'):
-    os.makedirs('data')
+CAMINHO_PADRAO = os.path.join('data', 'paises.db')
+# Segundos que uma conexão espera pela trava de escrita de outro processo antes de desistir
+ESPERA_TRAVA = 30.0
 
-db = sqlite3.connect('data/paises.db')
-cursor = db.cursor()
\ No newline at end of file
+caminho = None
+
+def conectar(caminho_db=CAMINHO_PADRAO, migrar=True):
+    global db, cursor, caminho
+    import sqlite3
+    from . import migrations
+
+    fechar()
+
+    # Garante que o diretório do banco existe
+    pasta = os.path.dirname(caminho_db)
+    if pasta and not os.path.exists(pasta):
+        os.makedirs(pasta)
+
+    db = sqlite3.connect(caminho_db, timeout=ESPERA_TRAVA)
+    # WAL: leitores não esperam pelo escritor, e vários processos de ingestão podem dividir o banco
+    db.execute('PRAGMA journal_mode=WAL')
+    caminho = caminho_db
+    cursor = db.cursor()
+    if migrar:
+        migrations.migrar(db)
+    return db
+
+def fechar():
+    atual = globals().pop('db', None)
+    globals().pop('cursor', None)
+    if atual is not None:
+        atual.close()
+
+def __getattr__(nome):
+    # A conexão padrão só é aberta no primeiro acesso a models.db / models.cursor
+    if nome in ('db', 'cursor'):
+        conectar()
+        return globals()[nome]
+    raise AttributeError(f"module 'models' has no attribute '{nome}'")
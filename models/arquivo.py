@@ -0,0 +1,8 @@
+def criar_tabela(db):
+    # JSON original de cada país (compactado com zlib), para reprojetar colunas sem refazer as buscas
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS paises_bruto(
+            nome_comum TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            atualizado_em TEXT)
+    ''')
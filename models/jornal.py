@@ -0,0 +1,12 @@
+def criar_tabela(db):
+    # Um registro por nome de entrada; status: pendente | concluido | falhou
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS jornal_ingestao(
+            nome TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            retentavel INTEGER NOT NULL DEFAULT 1,
+            erro TEXT,
+            atualizado_em TEXT)
+    ''')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_jornal_status ON jornal_ingestao(status)')
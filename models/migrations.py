@@ -0,0 +1,40 @@
+from . import paises, jornal, arquivo
+
+# Cada migração leva o banco da versão anterior para a sua; a versão atual fica em PRAGMA user_version.
+# Os passos usam IF NOT EXISTS para adotar bancos criados antes do controle de versão.
+MIGRACOES = [
+    (1, paises.criar_tabela),
+    (2, paises.criar_indice_nome),
+    (3, jornal.criar_tabela),
+    (4, arquivo.criar_tabela),
+    (5, paises.adicionar_geografia),
+    (6, paises.adicionar_cca2),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+def versao(db):
+    return db.execute('PRAGMA user_version').fetchone()[0]
+
+def migrar(db):
+    """Aplica as migrações pendentes, cada uma em sua própria transação; retorna as versões aplicadas"""
+    if versao(db) >= VERSAO_ATUAL:
+        return []
+
+    aplicadas = []
+    for numero, migracao in MIGRACOES:
+        # IMMEDIATE pega a trava de escrita antes de ler a versão: outro processo migrando o mesmo
+        # banco espera aqui, e a migração que ele já aplicou é pulada
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if versao(db) >= numero:
+                db.rollback()
+                continue
+            migracao(db)
+            db.execute(f'PRAGMA user_version = {numero}')
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        aplicadas.append(numero)
+    return aplicadas
@@ -1,21 +1,40 @@
-from . import db, cursor
+def criar_tabela(db):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS paises(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   nome_comum TEXT,
+                   nome_oficial TEXT,
+                   capital TEXT,
+                   continente TEXT,
+                   regiao TEXT,
+                   subregiao TEXT,
+                   populacao INTEGER,
+                   area REAL,
+                   moeda_nome TEXT,
+                   moeda_simbolo TEXT,
+                   idioma_principal TEXT,
+                   fuso_horario TEXT,
+                   bandeira_url TEXT)
+    ''')
 
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS paises(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-               nome_comum TEXT,
-               nome_oficial TEXT,
-               capital TEXT,
-               continente TEXT,
-               regiao TEXT,
-               subregiao TEXT,
-               populacao INTEGER,
-               area REAL,
-               moeda_nome TEXT,
-               moeda_simbolo TEXT,
-               idioma_principal TEXT,
-               fuso_horario TEXT,
-               bandeira_url TEXT)
-''')
+def criar_indice_nome(db):
+    # A verificação de duplicatas busca por nome_comum a cada inserção
+    db.execute('CREATE INDEX IF NOT EXISTS idx_paises_nome_comum ON paises(nome_comum)')
 
-db.commit()
\ No newline at end of file
+# Colunas de localização: coordenadas (latlng) e fronteiras como códigos cca3 separados por vírgula
+COLUNAS_GEOGRAFIA = [('latitude', 'REAL'), ('longitude', 'REAL'), ('fronteiras', 'TEXT'), ('cca3', 'TEXT')]
+
+def _adicionar_colunas(db, colunas):
+    # Bancos que já rodaram `reproject --campos ...` podem ter parte das colunas
+    existentes = {linha[1] for linha in db.execute('PRAGMA table_info(paises)')}
+    for coluna, tipo in colunas:
+        if coluna not in existentes:
+            db.execute(f'ALTER TABLE paises ADD COLUMN {coluna} {tipo}')
+
+def adicionar_geografia(db):
+    _adicionar_colunas(db, COLUNAS_GEOGRAFIA)
+    db.execute('CREATE INDEX IF NOT EXISTS idx_paises_cca3 ON paises(cca3)')
+
+def adicionar_cca2(db):
+    # Junto com cca3, permite atualizar países em lote pelo endpoint /alpha?codes=
+    _adicionar_colunas(db, [('cca2', 'TEXT')])